@@ -13,10 +13,16 @@ As with other files, you may not change any of the public behaviour (attributes,
 methods) given in the starter code, but you can definitely add new attributes
 and methods to complete your work here.
 """
+from __future__ import annotations
+import bisect
+import copy
 import csv
-from python_ta.contracts import check_contracts
+import random
+from typing import Any, Optional, Sequence
 
-from a1_entities import Person, Elevator
+from a1_contracts import check_contracts
+
+from a1_entities import Person, Elevator, WaitingRoom
 
 
 ###############################################################################
@@ -63,6 +69,46 @@ class ArrivalGenerator:
         """
         raise NotImplementedError
 
+    def next_arrival_round(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after round_num in which this generator
+        might generate arrivals, or None if it will never generate any more.
+
+        Event-driven simulations use this to skip over rounds with no arrivals.
+        It is always safe to return round_num itself, which is what this
+        default implementation does.
+
+        Preconditions:
+        - round_num >= 0
+        """
+        return round_num
+
+    def fork(self) -> ArrivalGenerator:
+        """Return an arrival generator that generates the same arrivals as this one
+        from now on, and that can be used at the same time as this one.
+
+        Used by Simulation.fork. This default implementation returns this generator
+        itself, which is right for generators whose arrivals only depend on the
+        round number. Generators that keep track of anything else (such as a
+        position in a file) must override it.
+        """
+        return self
+
+    def close(self) -> None:
+        """Release any files or other resources this generator holds.
+
+        This default implementation does nothing. Generators that read from files
+        override it. An arrival generator can also be used in a with statement,
+        which closes it at the end.
+        """
+
+    def __enter__(self) -> ArrivalGenerator:
+        """Return this generator, for use in a with statement."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Close this generator at the end of a with statement."""
+        self.close()
+
 
 @check_contracts
 class SingleArrivals(ArrivalGenerator):
@@ -119,6 +165,68 @@ class SingleArrivals(ArrivalGenerator):
         return {1: [new_person]}
 
 
+@check_contracts
+class UniformArrivals(ArrivalGenerator):
+    """An arrival generator that adds the same number of people every round, each
+    with a random starting floor and a different random target floor.
+
+    The arrivals for each round only depend on the seed and the round number, so two
+    generators with the same seed generate the same people, whatever order the
+    rounds are asked for in.
+
+    Instance Attributes:
+    - people_per_round: the number of people who arrive in each round
+    - seed: the seed used to choose the floors of the people arriving
+
+    Representation Invariants:
+    - self.people_per_round >= 0
+
+    >>> first = UniformArrivals(5, 3, seed=1)
+    >>> second = UniformArrivals(5, 3, seed=1)
+    >>> repr(first.generate(7)) == repr(second.generate(7))
+    True
+    >>> sum(len(people) for people in first.generate(0).values())
+    3
+    """
+    people_per_round: int
+    seed: int
+
+    def __init__(self, max_floor: int, people_per_round: int,
+                 seed: Optional[int] = None) -> None:
+        """Initialize a new UniformArrivals generator.
+
+        If seed is None, a seed is chosen using the random module, so calling
+        random.seed first makes the arrivals reproducible.
+
+        Preconditions:
+        - max_floor >= 2
+        - people_per_round >= 0
+        """
+        ArrivalGenerator.__init__(self, max_floor)
+        self.people_per_round = people_per_round
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+
+    def generate(self, round_num: int) -> dict[int, list[Person]]:
+        """Return the new arrivals for the simulation at the given round.
+
+        Preconditions:
+        - round_num >= 0
+        """
+        # Seeding from the (seed, round) pair as a string gives every pair its own
+        # stream, so generators with nearby seeds never share a round's arrivals
+        rng = random.Random(f'{self.seed}:{round_num}')
+        arrivals = {}
+        for _ in range(self.people_per_round):
+            start, target = rng.sample(range(1, self.max_floor + 1), 2)
+            if start in arrivals:
+                arrivals[start].append(Person(start, target))
+            else:
+                arrivals[start] = [Person(start, target)]
+        return arrivals
+
+
 @check_contracts
 class FileArrivals(ArrivalGenerator):
     """Generate arrivals from a CSV file.
@@ -161,6 +269,9 @@ class FileArrivals(ArrivalGenerator):
                         self.arrival_data[round_num] = [person]
                     i += 2
 
+        # The rounds with at least one arrival, in increasing order
+        self._rounds = sorted(self.arrival_data)
+
     def generate(self, round_num: int) -> dict[int, list[Person]]:
         """Return the new arrivals for the simulation at the given round.
 
@@ -184,9 +295,308 @@ class FileArrivals(ArrivalGenerator):
         >>> print(round0_arrivals[5])
         [Person(start=5, target=3, wait_time=0)]
         """
-        if round_num in self.arrival_data:
-            return {person.start: [person] for person in self.arrival_data[round_num]}
-        return {}
+        # Each call returns new people, so simulations sharing this generator never
+        # share the same person
+        arrivals = {}
+        for person in self.arrival_data.get(round_num, []):
+            if person.start in arrivals:
+                arrivals[person.start].append(Person(person.start, person.target))
+            else:
+                arrivals[person.start] = [Person(person.start, person.target)]
+        return arrivals
+
+    def next_arrival_round(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after round_num with at least one arrival
+        in the file, or None if there are no more.
+
+        Preconditions:
+        - round_num >= 0
+        """
+        index = bisect.bisect_left(self._rounds, round_num)
+        if index < len(self._rounds):
+            return self._rounds[index]
+        return None
+
+
+@check_contracts
+class StreamingFileArrivals(FileArrivals):
+    """Generate arrivals from a CSV file, reading it forward as the simulation runs.
+
+    The file has the same format as for FileArrivals, and its lines must be in
+    increasing order of round number. Rather than reading the whole file up front,
+    this only keeps the arrivals for the next few rounds in memory, so it can be
+    used with files that are too big to load.
+
+    generate (and next_arrival_round) must be called with round numbers that never
+    decrease, as a Simulation does. Given that, generate returns the same arrivals
+    as FileArrivals would for the same file.
+
+    Instance Attributes:
+    - arrival_data: the arrivals parsed from the file for the rounds in the window,
+        i.e., for the rounds from the last round asked for, up to (but not
+        including) window rounds later.
+    - window: the number of rounds of arrivals kept in memory
+
+    Representation Invariants:
+    - self.window >= 1
+    """
+    arrival_data: dict[int, list[Person]]
+    window: int
+
+    def __init__(self, max_floor: int, filename: str, window: int = 64) -> None:
+        """Initialize a new StreamingFileArrivals algorithm from the given file.
+
+        The file is opened and its first line is read straight away, so a
+        missing file or a malformed first line is reported here (and the file is
+        closed again). The rest of the file is only read as arrivals are asked
+        for. Call close, or use this generator in a with statement, to close the
+        file before it has all been read.
+
+        Preconditions:
+        - <filename> refers to a valid CSV file, following the specified
+          format and restrictions from the assignment handout, whose lines
+          are sorted by round number
+        - window >= 1
+        """
+        ArrivalGenerator.__init__(self, max_floor)
+        self.window = window
+        self.arrival_data = {}
+        self._rounds = []
+
+        # The file is read one line at a time with readline, so that the
+        # position of the next unread line is always known.
+        self._filename = filename
+        self._file = open(filename)
+        self._reader = csv.reader(iter(self._file.readline, ''))
+
+        # The next line of the file that has been read but not yet added to
+        # self.arrival_data, or None if the whole file has been read.
+        self._next_line = None
+        self._last_round = -1
+        try:
+            self._read_line()
+        except Exception:
+            self._file.close()
+            raise
+
+    def generate(self, round_num: int) -> dict[int, list[Person]]:
+        """Return the new arrivals for the simulation at the given round.
+
+        Preconditions:
+        - round_num >= 0
+        - round_num is at least the round number of every earlier call to
+          generate or next_arrival_round
+        """
+        self._advance(round_num)
+        return FileArrivals.generate(self, round_num)
+
+    def next_arrival_round(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after round_num with at least one arrival
+        in the file, or None if there are no more.
+
+        Preconditions:
+        - round_num >= 0
+        - round_num is at least the round number of every earlier call to
+          generate or next_arrival_round
+        """
+        self._advance(round_num)
+        if self._rounds:
+            return self._rounds[0]
+        if self._next_line is not None:
+            return int(self._next_line[0])
+        return None
+
+    def fork(self) -> StreamingFileArrivals:
+        """Return a copy of this generator that reads the same file from the same line,
+        independently of this one.
+        """
+        return copy.deepcopy(self)
+
+    def close(self) -> None:
+        """Close the file. This happens automatically once the whole file has been read."""
+        self._file.close()
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Return the state of this generator for pickling.
+
+        The open file is not pickled, only the position of its next unread line.
+        """
+        state = self.__dict__.copy()
+        del state['_file'], state['_reader']
+        state['_position'] = None if self._file.closed else self._file.tell()
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore this generator from the given pickled state, reopening its file at
+        the line where it stopped.
+        """
+        position = state.pop('_position')
+        self.__dict__.update(state)
+        self._file = open(self._filename)
+        if position is None:
+            self._file.close()
+        else:
+            self._file.seek(position)
+        self._reader = csv.reader(iter(self._file.readline, ''))
+
+    def _advance(self, round_num: int) -> None:
+        """Move the window forward so it starts at round_num: forget the arrivals for
+        earlier rounds, and read the arrivals for the rounds before round_num + window.
+        """
+        while self._rounds and self._rounds[0] < round_num:
+            del self.arrival_data[self._rounds.pop(0)]
+
+        while self._next_line is not None and int(self._next_line[0]) < round_num + self.window:
+            line = self._next_line
+            line_round = int(line[0])
+            if line_round >= round_num:
+                if line_round not in self.arrival_data:
+                    self.arrival_data[line_round] = []
+                    self._rounds.append(line_round)
+                i = 1
+                while i < len(line):
+                    self.arrival_data[line_round].append(Person(int(line[i]), int(line[i + 1])))
+                    i += 2
+            self._read_line()
+
+    def _read_line(self) -> None:
+        """Read the next non-empty line of the file into self._next_line, closing the
+        file at the end.
+
+        Raise a ValueError if the line's round number is lower than the previous line's.
+        """
+        self._next_line = next(self._reader, None)
+        while self._next_line is not None and not self._next_line:
+            self._next_line = next(self._reader, None)
+
+        if self._next_line is None:
+            self._file.close()
+            return
+
+        line_round = int(self._next_line[0])
+        if line_round < self._last_round:
+            raise ValueError(f'round {line_round} comes after round {self._last_round} '
+                             f'in {self._file.name}; the file must be sorted by round')
+        self._last_round = line_round
+
+
+###############################################################################
+# Building snapshots
+###############################################################################
+@check_contracts
+class BuildingSnapshot:
+    """The state of a building at one moment, along with facts derived from it that
+    moving algorithms often need.
+
+    A Simulation builds one snapshot each round, just before the elevators move, and
+    passes it to a moving algorithm that uses snapshots (see
+    MovingAlgorithm.uses_snapshot). Each derived fact is worked out the first time
+    it is used and then kept, so an algorithm only pays for the facts it uses, and
+    pays for each of them once. A snapshot must not be used once the building has
+    changed.
+
+    Instance Attributes:
+    - elevators: the building's elevators
+    - waiting: a dictionary mapping floor number to the people waiting on that floor
+        (as passed to MovingAlgorithm.update_target_floors)
+    - max_floor: the maximum floor number in the building
+
+    Representation Invariants:
+    - self.max_floor >= 1
+
+    >>> elevator = Elevator(3)
+    >>> elevator.board(Person(1, 4))
+    >>> elevator.board(Person(1, 2))
+    >>> snapshot = BuildingSnapshot([elevator, Elevator(3)],
+    ...                             {1: [], 2: [Person(2, 1)], 3: [], 4: []}, 4)
+    >>> snapshot.waiting_counts, snapshot.occupied_floors, snapshot.elevator_loads
+    ([0, 0, 1, 0, 0], [2], [2, 0])
+    >>> [bin(targets) for targets in snapshot.passenger_targets]
+    ['0b10100', '0b0']
+    >>> len(snapshot.elevators_by_floor[1])
+    2
+    """
+    elevators: list[Elevator]
+    waiting: dict[int, Sequence[Person]]
+    max_floor: int
+
+    def __init__(self, elevators: list[Elevator], waiting: dict[int, Sequence[Person]],
+                 max_floor: int,
+                 elevators_by_floor: Optional[dict[int, list[Elevator]]] = None) -> None:
+        """Initialize a snapshot of the given building.
+
+        elevators_by_floor, if given, maps each floor with an elevator on it to the
+        elevators on that floor, in the order of elevators. A Simulation passes its
+        own freshly built index, so it does not need to be worked out again.
+
+        Preconditions:
+        - elevators, waiting, and max_floor are from the same simulation run
+        """
+        self.elevators = elevators
+        self.waiting = waiting
+        self.max_floor = max_floor
+
+        # The derived facts, or None for those that have not been worked out yet
+        self._elevators_by_floor = elevators_by_floor
+        self._waiting_counts = None
+        self._occupied_floors = None
+        self._elevator_loads = None
+        self._passenger_targets = None
+
+    @property
+    def elevators_by_floor(self) -> dict[int, list[Elevator]]:
+        """A dictionary mapping each floor with an elevator on it to the elevators on
+        that floor, in the order of self.elevators.
+        """
+        if self._elevators_by_floor is None:
+            self._elevators_by_floor = {}
+            for elevator in self.elevators:
+                self._elevators_by_floor.setdefault(elevator.current_floor,
+                                                    []).append(elevator)
+        return self._elevators_by_floor
+
+    @property
+    def waiting_counts(self) -> list[int]:
+        """The number of people waiting on each floor, indexed by floor number.
+
+        Index 0 is unused, and always 0.
+        """
+        if self._waiting_counts is None:
+            self._waiting_counts = [0] * (self.max_floor + 1)
+            for floor_num, people in self.waiting.items():
+                self._waiting_counts[floor_num] = len(people)
+        return self._waiting_counts
+
+    @property
+    def occupied_floors(self) -> list[int]:
+        """The floors where anyone is waiting, in increasing order.
+
+        This may be the WaitingRoom's own list; do not mutate it.
+        """
+        if self._occupied_floors is None:
+            self._occupied_floors = _occupied_floors(self.waiting)
+        return self._occupied_floors
+
+    @property
+    def elevator_loads(self) -> list[int]:
+        """The number of passengers on each elevator, in the order of self.elevators."""
+        if self._elevator_loads is None:
+            self._elevator_loads = [len(elevator.passengers) for elevator in self.elevators]
+        return self._elevator_loads
+
+    @property
+    def passenger_targets(self) -> list[int]:
+        """The target floors of each elevator's passengers, in the order of
+        self.elevators, as a bitmap: bit f is set if a passenger wants floor f.
+        """
+        if self._passenger_targets is None:
+            self._passenger_targets = []
+            for elevator in self.elevators:
+                bitmap = 0
+                for target in elevator.passenger_target_floors():
+                    bitmap |= 1 << target
+                self._passenger_targets.append(bitmap)
+        return self._passenger_targets
 
 
 ###############################################################################
@@ -202,16 +612,25 @@ class MovingAlgorithm:
 
     This is an abstract class, and should not be instantiated directly.
     We have started two subclasses of this class down below.
+
+    An algorithm that sets uses_snapshot to True is given a BuildingSnapshot by the
+    simulation each round, through update_from_snapshot, instead of being called
+    through update_target_floors.
     """
+    # Whether a Simulation calls update_from_snapshot rather than update_target_floors
+    uses_snapshot: bool = False
+
     def update_target_floors(self,
                              elevators: list[Elevator],
-                             waiting: dict[int, list[Person]],
+                             waiting: dict[int, Sequence[Person]],
                              max_floor: int) -> None:
         """Updates elevator target floors.
 
         The parameters are:
         - elevators: a list of the system's elevators
-        - waiting: a dictionary mapping floor number to the list of people waiting on that floor
+        - waiting: a dictionary mapping floor number to the people waiting on that floor, in
+          the order they arrived. Each value is a list, or a WaitingQueue (which can be
+          used like a list) when called by a Simulation.
         - max_floor: the maximum floor number in the simulation
 
         Preconditions:
@@ -219,6 +638,32 @@ class MovingAlgorithm:
         """
         raise NotImplementedError
 
+    def update_from_snapshot(self, snapshot: BuildingSnapshot) -> None:
+        """Updates the target floors of the elevators in the given snapshot.
+
+        By default, this calls update_target_floors with the snapshot's building.
+        Algorithms that use snapshots override this, and make update_target_floors
+        build a snapshot and call this.
+        """
+        self.update_target_floors(snapshot.elevators, snapshot.waiting, snapshot.max_floor)
+
+    def is_quiescent(self,
+                     elevators: list[Elevator],
+                     waiting: dict[int, Sequence[Person]],
+                     max_floor: int) -> bool:
+        """Return whether update_target_floors would leave every elevator's target floor
+        unchanged, both now and in every later round until one of these events:
+        - someone arrives, boards an elevator, or leaves an elevator
+        - a moving elevator reaches its target floor
+
+        Event-driven simulations use this to skip over quiet rounds. It is always
+        safe to return False, which is what this default implementation does.
+
+        Preconditions:
+        - elevators, waiting, and max_floor are from the same simulation run
+        """
+        return False
+
 
 @check_contracts
 class EndToEndLoop(MovingAlgorithm):
@@ -234,17 +679,34 @@ class EndToEndLoop(MovingAlgorithm):
     - This algorithm IGNORES the passengers on the elevators, and the people
       who are waiting for an elevator.
     """
+    uses_snapshot = True
 
     def update_target_floors(self,
                              elevators: list[Elevator],
-                             waiting: dict[int, list[Person]],
+                             waiting: dict[int, Sequence[Person]],
                              max_floor: int) -> None:
         """Updates elevator target floors based on the algorithm's rules."""
-        for elevator in elevators:
-            if elevator.current_floor == 1:
-                elevator.target_floor = max_floor
-            elif elevator.current_floor == max_floor:
-                elevator.target_floor = 1
+        self.update_from_snapshot(BuildingSnapshot(elevators, waiting, max_floor))
+
+    def update_from_snapshot(self, snapshot: BuildingSnapshot) -> None:
+        """Updates elevator target floors based on the algorithm's rules."""
+        # Only the elevators on the bottom and top floors get new target floors
+        elevators_by_floor = snapshot.elevators_by_floor
+        for elevator in elevators_by_floor.get(1, ()):
+            elevator.target_floor = snapshot.max_floor
+        for elevator in elevators_by_floor.get(snapshot.max_floor, ()):
+            elevator.target_floor = 1
+
+    def is_quiescent(self,
+                     elevators: list[Elevator],
+                     waiting: dict[int, Sequence[Person]],
+                     max_floor: int) -> bool:
+        """Return whether no elevator is on the bottom or top floor.
+
+        Only elevators on those floors get new target floors, and a moving elevator
+        can only reach one of them by reaching its target floor.
+        """
+        return all(elevator.current_floor not in (1, max_floor) for elevator in elevators)
 
 
 @check_contracts
@@ -267,19 +729,59 @@ class FurthestFloor(MovingAlgorithm):
 
     Note: In Cases 1 and 2, if there is a tie, always pick the *lowest* floor.
     """
+    uses_snapshot = True
+
     def update_target_floors(self, elevators, waiting, max_floor):
-        for elevator in elevators:
+        self.update_from_snapshot(BuildingSnapshot(elevators, waiting, max_floor))
+
+    def update_from_snapshot(self, snapshot: BuildingSnapshot) -> None:
+        """Updates elevator target floors based on the algorithm's rules."""
+        # Only the lowest and highest floors with someone waiting can ever be
+        # chosen. A WaitingRoom keeps its occupied floors sorted as people come
+        # and go; otherwise, the snapshot finds them with a single scan shared by
+        # every elevator.
+        occupied = snapshot.occupied_floors
+        if not occupied:
+            return
+        lowest, highest = occupied[0], occupied[-1]
+
+        # Elevators on the same floor get the same target floor, so it is only
+        # worked out once for each floor with an elevator on it.
+        for current, elevators in snapshot.elevators_by_floor.items():
             # Calculate the furthest distance for both up and down directions
-            floors_above = [floor for floor in range(elevator.current_floor + 1, max_floor + 1) if
-                            waiting[floor]]
-            floors_below = [floor for floor in range(1, elevator.current_floor) if waiting[floor]]
-
-            if floors_above and (not floors_below or max(floors_above) - elevator.current_floor >=
-                                 elevator.current_floor - min(floors_below)):
-                elevator.target_floor = max(floors_above)
-            elif floors_below:
+            has_above = highest > current
+            has_below = lowest < current
+
+            if has_above and (not has_below or highest - current >= current - lowest):
+                target = highest
+            elif has_below:
                 # If there are waiting floors below and they are closer
-                elevator.target_floor = min(floors_below)
+                target = lowest
+            else:
+                continue
+            for elevator in elevators:
+                elevator.target_floor = target
+
+    def is_quiescent(self,
+                     elevators: list[Elevator],
+                     waiting: dict[int, Sequence[Person]],
+                     max_floor: int) -> bool:
+        """Return whether nobody is waiting for an elevator.
+
+        Target floors are only ever changed to floors where people are waiting.
+        """
+        return not _occupied_floors(waiting)
+
+
+def _occupied_floors(waiting: dict[int, Sequence[Person]]) -> list[int]:
+    """Return the floors in waiting where anyone is waiting, in increasing order.
+
+    >>> _occupied_floors({1: [], 2: [Person(2, 1)], 3: []})
+    [2]
+    """
+    if isinstance(waiting, WaitingRoom):
+        return waiting.occupied_floors()
+    return sorted(floor for floor, people in waiting.items() if people)
 
 
 if __name__ == '__main__':
@@ -297,8 +799,9 @@ if __name__ == '__main__':
     # "Ctrl + /" or "⌘ + /".
     # import python_ta
     # python_ta.check_all(config={
-    #     'allowed-io': ['FileArrivals.__init__'],
-    #     'extra-imports': ['a1_entities', 'csv'],
+    #     'allowed-io': ['FileArrivals.__init__', 'StreamingFileArrivals.__init__'],
+    #     'extra-imports': ['a1_contracts', 'a1_entities', 'bisect', 'copy', 'csv',
+    #                       'random'],
     #     'max-nested-blocks': 4,
     #     'max-line-length': 100
     # })
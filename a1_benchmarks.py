@@ -0,0 +1,802 @@
+"""CSC148 Assignment 1 - Benchmarks
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains timing benchmarks for the simulation. None of these
+functions are used by the simulation itself; run this module directly to print
+the results.
+
+The benchmark suite (see run_suite) runs fixed-seed scenarios, from a small
+building to a skyscraper, and measures whole simulation runs along with each
+moving algorithm and arrival generator on its own. Its results can be saved as
+JSON and compared with the results saved from another commit:
+
+    python a1_benchmarks.py --suite --output before.json
+    python a1_benchmarks.py --suite --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Optional
+
+import a1_algorithms
+from a1_entities import Elevator, Person, WaitingRoom
+from a1_profiling import StageHook
+
+
+###############################################################################
+# Entity benchmarks
+###############################################################################
+def bench_person_creation(num_people: int, visualize: bool) -> float:
+    """Return how many people per second can be created.
+
+    If visualize is False, only the headless Person model is created (this is
+    what a headless Simulation does). Otherwise, a sprite is also attached to
+    each person, as the Visualizer does when it shows an arrival.
+
+    Preconditions:
+    - num_people >= 1
+    """
+    if visualize:
+        from a1_sprites import PersonSprite
+
+    start_time = time.perf_counter()
+    for i in range(num_people):
+        person = Person(1, 2 + i % 5)
+        if visualize:
+            PersonSprite(person)
+    elapsed = time.perf_counter() - start_time
+
+    return num_people / elapsed
+
+
+class _DictPerson:
+    """A person stored the way Person was before it used slots: with the same
+    attributes, in an instance dictionary. Used by bench_person_memory.
+    """
+    def __init__(self, start: int, target: int) -> None:
+        """Initialize a new person with the given start and target floors, who is
+        not waiting in any simulation.
+        """
+        self.start = start
+        self.target = target
+        self._clock = None
+        self._waiting_since = 0
+        self._wait_time = 0
+
+
+def bench_person_memory(num_people: int) -> dict[str, float]:
+    """Return the memory used, in bytes per person, by the given number of people
+    waiting in a simulation at once, stored in three ways:
+    - 'dict': as objects with an instance dictionary, as Person used to be
+    - 'slots': as Person objects, which use slots
+    - 'arrays': as the NumPy person buffers (target, arrival round and next person
+      in the queue) that VectorizedSimulation uses
+
+    Each person arrived in one of 10,000 rounds, and the people objects are kept in a
+    list. Memory is measured with tracemalloc.
+
+    Preconditions:
+    - num_people >= 1
+    """
+    import numpy as np
+    from a1_entities import RoundClock
+
+    clock = RoundClock()
+    results = {}
+    for name in ('dict', 'slots', 'arrays'):
+        tracemalloc.start()
+        if name == 'arrays':
+            people = [np.arange(num_people, dtype=np.int32) % 99 + 2,
+                      np.arange(num_people, dtype=np.int32) // 100,
+                      np.arange(1, num_people + 1, dtype=np.int64)]
+        else:
+            people = []
+            for i in range(num_people):
+                clock.round_num = i // 100
+                if name == 'dict':
+                    person = _DictPerson(i % 100 + 1, i % 99 + 2)
+                    person._clock = clock
+                    person._waiting_since = clock.round_num
+                else:
+                    person = Person(i % 100 + 1, i % 99 + 2)
+                    person.start_waiting(clock)
+                people.append(person)
+        results[name] = tracemalloc.get_traced_memory()[0] / num_people
+        tracemalloc.stop()
+        del people
+    return results
+
+
+###############################################################################
+# Startup benchmarks
+###############################################################################
+def bench_import_time(module_name: str, repeats: int = 5) -> tuple[float, bool]:
+    """Return the fastest time in seconds, over the given number of fresh Python
+    processes, to import the given module, and whether importing it also
+    imported Pygame.
+
+    Preconditions:
+    - repeats >= 1
+    """
+    code = ('import sys, time\n'
+            'start_time = time.perf_counter()\n'
+            f'import {module_name}\n'
+            'print(time.perf_counter() - start_time, "pygame" in sys.modules)\n')
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+
+    best_time = float('inf')
+    imported_pygame = False
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=env, capture_output=True, text=True, check=True)
+        elapsed, pygame_flag = output.stdout.split()[-2:]
+        best_time = min(best_time, float(elapsed))
+        imported_pygame = imported_pygame or pygame_flag == 'True'
+    return best_time, imported_pygame
+
+
+###############################################################################
+# Simulation benchmarks
+###############################################################################
+def bench_simulation_rounds(num_rounds: int) -> float:
+    """Return how many rounds per second a small headless simulation runs.
+
+    Preconditions:
+    - num_rounds >= 1
+    """
+    from a1_simulation import Simulation
+
+    config = {
+        'num_floors': 10,
+        'num_elevators': 4,
+        'elevator_capacity': 5,
+        'arrival_generator': a1_algorithms.SingleArrivals(10),
+        'moving_algorithm': a1_algorithms.FurthestFloor(),
+        'visualize': False
+    }
+    simulation = Simulation(config)
+
+    start_time = time.perf_counter()
+    simulation.run(num_rounds)
+    elapsed = time.perf_counter() - start_time
+
+    return num_rounds / elapsed
+
+
+def bench_contracts(num_rounds: int) -> dict[str, float]:
+    """Return the rounds per second of bench_simulation_rounds with python_ta
+    contract checking turned off and on.
+
+    Contracts are installed when the simulation modules are imported, so each
+    setting is measured in a fresh Python process.
+
+    Preconditions:
+    - num_rounds >= 1
+    """
+    results = {}
+    for setting in ('off', 'on'):
+        env = dict(os.environ,
+                   A1_CHECK_CONTRACTS='1' if setting == 'on' else '0',
+                   PYGAME_HIDE_SUPPORT_PROMPT='1')
+        output = subprocess.run(
+            [sys.executable, '-c',
+             f'import a1_benchmarks; print(a1_benchmarks.bench_simulation_rounds({num_rounds}))'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, capture_output=True, text=True, check=True)
+        results[setting] = float(output.stdout.split()[-1])
+    return results
+
+
+# The least speedup that VectorizedSimulation should have over Simulation in
+# bench_engines, on a 200-floor, 50-elevator building with 100 arrivals per round
+ENGINE_SPEEDUP = 1.25
+
+
+def bench_engines(num_floors: int, num_elevators: int, rate: float,
+                  num_rounds: int, repeats: int = 1) -> dict[str, dict[str, float]]:
+    """Return the rounds per second of Simulation and VectorizedSimulation on the
+    same building, with Poisson arrivals at the given rate, for EndToEndLoop and
+    FurthestFloor.
+
+    The result maps each algorithm's name to the rounds per second of each engine.
+    Each engine is run repeats times, and the fastest run is kept.
+
+    Compare the speedup of VectorizedSimulation with ENGINE_SPEEDUP.
+
+    Preconditions:
+    - num_floors >= 2
+    - num_elevators >= 1
+    - rate >= 0
+    - num_rounds >= 1
+    - repeats >= 1
+    """
+    from a1_simulation import Simulation
+    from a1_traffic import PoissonArrivals
+    from a1_vectorized import VectorizedSimulation
+
+    results = {}
+    engines = (('Simulation', Simulation), ('VectorizedSimulation', VectorizedSimulation))
+    for algorithm_class in (a1_algorithms.EndToEndLoop, a1_algorithms.FurthestFloor):
+        algorithm_results = results[algorithm_class.__name__] = {}
+        for name, engine in engines:
+            best_time = float('inf')
+            for _ in range(repeats):
+                config = {
+                    'num_floors': num_floors,
+                    'num_elevators': num_elevators,
+                    'elevator_capacity': 20,
+                    'arrival_generator': PoissonArrivals(num_floors, rate, seed=0),
+                    'moving_algorithm': algorithm_class(),
+                    'visualize': False
+                }
+                simulation = engine(config)
+
+                start_time = time.perf_counter()
+                simulation.run(num_rounds)
+                best_time = min(best_time, time.perf_counter() - start_time)
+            algorithm_results[name] = num_rounds / best_time
+    return results
+
+
+def bench_furthest_floor(num_floors: int, num_elevators: int, num_updates: int) -> dict[str, float]:
+    """Return how many FurthestFloor target updates per second run on a building
+    whose waiting people are stored in a plain dictionary of lists (so the
+    occupied floors must be found by a scan) and in a WaitingRoom (which keeps
+    them sorted as people come and go).
+
+    Before each update, one person arrives on a random floor and one person
+    boards on another, as happens in a busy simulation.
+
+    Preconditions:
+    - num_floors >= 2
+    - num_elevators >= 1
+    - num_updates >= 1
+    """
+    algorithm = a1_algorithms.FurthestFloor()
+    results = {}
+    for name in ('dict of lists', 'WaitingRoom'):
+        rng = random.Random(0)
+        if name == 'WaitingRoom':
+            waiting = WaitingRoom(num_floors)
+        else:
+            waiting = {floor_num: [] for floor_num in range(1, num_floors + 1)}
+        elevators = [Elevator(10) for _ in range(num_elevators)]
+        for elevator in elevators:
+            elevator.current_floor = rng.randint(1, num_floors)
+        for _ in range(num_floors // 4):
+            start = rng.randint(1, num_floors)
+            waiting[start].append(Person(start, 1 if start > 1 else 2))
+
+        start_time = time.perf_counter()
+        for _ in range(num_updates):
+            start = rng.randint(1, num_floors)
+            waiting[start].append(Person(start, 1 if start > 1 else 2))
+            people = waiting[rng.randint(1, num_floors)]
+            if people:
+                people.pop(0)
+            algorithm.update_target_floors(elevators, waiting, num_floors)
+        results[name] = num_updates / (time.perf_counter() - start_time)
+    return results
+
+
+# The longest that NearestCar may take, in seconds, to update the target floors in a
+# round of bench_nearest_car, on average and in 99% of rounds. The budget is not on
+# the single slowest round: on a shared CPU, that round is the one in which the
+# operating system happened to run something else, whichever round it is.
+NEAREST_CAR_BUDGET = 0.001
+
+
+class _MoveStageTimes(StageHook):
+    """A stage hook that records the time taken by every move stage.
+    Used by bench_nearest_car.
+    """
+    def __init__(self) -> None:
+        """Initialize a new hook, with no times recorded."""
+        self.times = []
+        self._start_time = 0.0
+
+    def before_stage(self, stage: str, round_num: int) -> None:
+        """Start timing the given stage, if it is the move stage."""
+        if stage == 'move_elevators':
+            self._start_time = time.perf_counter()
+
+    def after_stage(self, stage: str, round_num: int) -> None:
+        """Record the time taken by the given stage, in seconds, if it is the move stage."""
+        if stage == 'move_elevators':
+            self.times.append(time.perf_counter() - self._start_time)
+
+
+def bench_nearest_car(num_floors: int, num_elevators: int, rate: float,
+                      num_rounds: int) -> dict[str, float]:
+    """Return the mean, 99th percentile and longest time in seconds that a simulation
+    with NearestCar takes to move its elevators in a round (which includes updating
+    their target floors), on a building with the given number of floors and
+    elevators, and Poisson arrivals at the given rate.
+
+    Compare the mean and 99th percentile with NEAREST_CAR_BUDGET.
+
+    Preconditions:
+    - num_floors >= 2
+    - num_elevators >= 1
+    - rate >= 0
+    - num_rounds >= 1
+    """
+    from a1_dispatch import NearestCar
+    from a1_simulation import Simulation
+    from a1_traffic import PoissonArrivals
+
+    config = {
+        'num_floors': num_floors,
+        'num_elevators': num_elevators,
+        'elevator_capacity': 20,
+        'arrival_generator': PoissonArrivals(num_floors, rate, seed=0),
+        'moving_algorithm': NearestCar(),
+        'visualize': False
+    }
+    simulation = Simulation(config)
+    hook = _MoveStageTimes()
+    simulation.add_stage_hook(hook)
+    simulation.run(num_rounds)
+
+    times = sorted(hook.times)
+    return {
+        'mean_time': sum(times) / len(times),
+        'p99_time': times[-(-len(times) * 99 // 100) - 1],
+        'max_time': times[-1]
+    }
+
+
+class _TravelCounter(StageHook):
+    """A stage hook that counts the floors that a simulation's elevators travel,
+    in total and while empty. Used by bench_rush_hour.
+    """
+    def __init__(self, simulation: Any) -> None:
+        """Initialize a new hook for the given simulation, with no floors counted."""
+        self.simulation = simulation
+        self.travel = 0
+        self.empty_travel = 0
+        self._before = []
+
+    def before_stage(self, stage: str, round_num: int) -> None:
+        """Record where each elevator is, and whether it is empty, before the move stage."""
+        if stage == 'move_elevators':
+            self._before = [(elevator.current_floor, len(elevator.passengers))
+                            for elevator in self.simulation.elevators]
+
+    def after_stage(self, stage: str, round_num: int) -> None:
+        """Count the floors each elevator travelled in the move stage."""
+        if stage == 'move_elevators':
+            for (floor, num_passengers), elevator in zip(self._before,
+                                                         self.simulation.elevators):
+                distance = abs(elevator.current_floor - floor)
+                self.travel += distance
+                if num_passengers == 0:
+                    self.empty_travel += distance
+
+
+def bench_rush_hour(num_floors: int, num_elevators: int, rate: float,
+                    num_rounds: int) -> dict[str, dict[str, float]]:
+    """Return the average wait time, and the number of floors travelled in total and
+    while empty, for each moving algorithm in a1_sweep.MOVING_ALGORITHMS, on a
+    building with the given number of floors and elevators, and up-peak Poisson
+    arrivals at the given rate.
+
+    Preconditions:
+    - num_floors >= 2
+    - num_elevators >= 1
+    - rate >= 0
+    - num_rounds >= 1
+    """
+    from a1_simulation import Simulation
+    from a1_sweep import MOVING_ALGORITHMS
+    from a1_traffic import PoissonArrivals
+
+    results = {}
+    for algorithm_name, algorithm_class in MOVING_ALGORITHMS.items():
+        config = {
+            'num_floors': num_floors,
+            'num_elevators': num_elevators,
+            'elevator_capacity': 15,
+            'arrival_generator': PoissonArrivals(num_floors, rate, 'up-peak', seed=0),
+            'moving_algorithm': algorithm_class(),
+            'visualize': False
+        }
+        simulation = Simulation(config)
+        counter = _TravelCounter(simulation)
+        simulation.add_stage_hook(counter)
+        stats = simulation.run(num_rounds)
+        results[algorithm_name] = {
+            'avg_time': stats['avg_time'],
+            'travel': counter.travel,
+            'empty_travel': counter.empty_travel
+        }
+    return results
+
+
+###############################################################################
+# Arrival file benchmarks
+###############################################################################
+def bench_arrival_files(num_rounds: int, people_per_round: int) -> dict[str, float]:
+    """Return the time in seconds to load, and then generate every round of, an
+    arrival file with the given number of rounds and people per round, using
+    FileArrivals on a CSV file and TraceArrivals on the same file converted to a
+    trace.
+
+    Preconditions:
+    - num_rounds >= 1
+    - people_per_round >= 1
+    """
+    from a1_traces import TraceArrivals, convert_csv
+
+    rng = random.Random(0)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'arrivals.csv')
+        trace_path = os.path.join(directory, 'arrivals.trace')
+        with open(csv_path, 'w') as csvfile:
+            for round_num in range(num_rounds):
+                floors = [rng.randint(1, 10) for _ in range(2 * people_per_round)]
+                csvfile.write(','.join(map(str, [round_num] + floors)) + '\n')
+        convert_csv(csv_path, trace_path)
+
+        for name in ('FileArrivals', 'TraceArrivals'):
+            start_time = time.perf_counter()
+            if name == 'FileArrivals':
+                generator = a1_algorithms.FileArrivals(10, csv_path)
+            else:
+                generator = TraceArrivals(10, trace_path)
+            for round_num in range(num_rounds):
+                generator.generate(round_num)
+            results[name] = time.perf_counter() - start_time
+            generator.close()
+    return results
+
+
+###############################################################################
+# Benchmark suite
+###############################################################################
+# The scenarios of the benchmark suite, by name. Each scenario is a spec in the
+# format of a1_sweep, without a moving algorithm: the suite runs every scenario
+# with each moving algorithm in a1_sweep.MOVING_ALGORITHMS. If 'record_trace' is
+# True, the scenario's arrivals are first recorded to a trace file, and the
+# simulation replays them with TraceArrivals.
+SCENARIOS: dict[str, dict[str, Any]] = {
+    'small': {
+        'num_floors': 6, 'num_elevators': 2, 'elevator_capacity': 4,
+        'arrival_generator': {'name': 'UniformArrivals', 'people_per_round': 1},
+        'num_rounds': 20000, 'seed': 148
+    },
+    'mid-rise': {
+        'num_floors': 25, 'num_elevators': 6, 'elevator_capacity': 10,
+        'arrival_generator': {'name': 'PoissonArrivals', 'rate': 2.0, 'profile': 'daily',
+                              'rounds_per_day': 10000},
+        'num_rounds': 10000, 'seed': 148
+    },
+    'skyscraper': {
+        'num_floors': 120, 'num_elevators': 32, 'elevator_capacity': 20,
+        'arrival_generator': {'name': 'PoissonArrivals', 'rate': 6.0},
+        'num_rounds': 5000, 'seed': 148
+    },
+    'rush-hour': {
+        'num_floors': 40, 'num_elevators': 12, 'elevator_capacity': 15,
+        'arrival_generator': {'name': 'PoissonArrivals', 'rate': 6.0, 'profile': 'up-peak'},
+        'num_rounds': 5000, 'seed': 148, 'record_trace': True
+    },
+}
+
+# The metrics that compare_results compares, and whether higher values are better
+_METRICS = {
+    'rounds_per_second': True,
+    'people_per_second': True,
+    'updates_per_second': True,
+    'peak_memory': False
+}
+
+
+def run_suite(scenarios: Optional[list[str]] = None, scale: float = 1.0,
+              repeats: int = 1) -> dict[str, Any]:
+    """Run the benchmark suite on the given scenarios (by default, all of them), and
+    return its results in a form that can be saved as JSON.
+
+    The results have 'metadata' about the run, and 'results' for each benchmark:
+    - 'run/<scenario>/<algorithm>': a full Simulation.run (see bench_run)
+    - 'update/<scenario>/<algorithm>': the moving algorithm on its own (see
+      bench_moving_algorithm)
+    - 'generate/<scenario>': the arrival generator on its own (see
+      bench_arrival_generator)
+
+    Each scenario's number of rounds is multiplied by scale, and each timing is the
+    fastest of the given number of repeats.
+
+    Preconditions:
+    - every name in scenarios is a key of SCENARIOS
+    - scale > 0
+    - repeats >= 1
+    """
+    from a1_sweep import MOVING_ALGORITHMS
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in scenarios or SCENARIOS:
+            for algorithm_name in MOVING_ALGORITHMS:
+                spec = _scenario_spec(name, algorithm_name, directory, scale)
+                results[f'run/{name}/{algorithm_name}'] = bench_run(spec, repeats)
+                results[f'update/{name}/{algorithm_name}'] = bench_moving_algorithm(
+                    spec, repeats)
+            results[f'generate/{name}'] = bench_arrival_generator(spec, repeats)
+
+    metadata = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scale': scale,
+        'repeats': repeats
+    }
+    return {'metadata': metadata, 'results': results}
+
+
+def bench_run(spec: dict[str, Any], repeats: int = 1) -> dict[str, float]:
+    """Return the rounds per second, people per second and peak memory use (in bytes)
+    of a full Simulation.run of the given spec, along with its people_completed and
+    avg_time, which show whether a change to the code changed the results.
+
+    The rates are the fastest of the given number of runs. Peak memory is measured
+    with tracemalloc in one more run, since tracing slows the simulation down.
+
+    Preconditions:
+    - spec is a spec in the format of a1_sweep
+    - repeats >= 1
+    """
+    best_time = float('inf')
+    for _ in range(repeats):
+        simulation = _build_simulation(spec)
+        start_time = time.perf_counter()
+        stats = simulation.run(spec['num_rounds'])
+        best_time = min(best_time, time.perf_counter() - start_time)
+        simulation.arrival_generator.close()
+
+    tracemalloc.start()
+    try:
+        simulation = _build_simulation(spec)
+        simulation.run(spec['num_rounds'])
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    simulation.arrival_generator.close()
+
+    return {
+        'rounds_per_second': spec['num_rounds'] / best_time,
+        'people_per_second': stats['total_people'] / best_time,
+        'peak_memory': peak_memory,
+        'people_completed': stats['people_completed'],
+        'avg_time': stats['avg_time']
+    }
+
+
+def bench_moving_algorithm(spec: dict[str, Any], repeats: int = 1) -> dict[str, float]:
+    """Return how many times per second the given spec's moving algorithm updates
+    the target floors of the elevators, during a full Simulation.run of the spec.
+
+    Each update is timed as the move stage of a round, as in bench_nearest_car, so
+    it includes building the algorithm's snapshot (if it uses one) and moving the
+    elevators. Since every update sees the building as the run left it, algorithms
+    that keep state between rounds are timed doing the work they really do.
+
+    The rate is the fastest of the given number of repeats.
+
+    Preconditions:
+    - spec is a spec in the format of a1_sweep
+    - repeats >= 1
+    """
+    best_rate = 0.0
+    for _ in range(repeats):
+        simulation = _build_simulation(spec)
+        hook = _MoveStageTimes()
+        simulation.add_stage_hook(hook)
+        simulation.run(spec['num_rounds'])
+        simulation.arrival_generator.close()
+        best_rate = max(best_rate, len(hook.times) / sum(hook.times))
+    return {'updates_per_second': best_rate}
+
+
+def bench_arrival_generator(spec: dict[str, Any], repeats: int = 1) -> dict[str, float]:
+    """Return the rounds per second and people per second of the given spec's arrival
+    generator generating every round of the spec on its own.
+
+    The rates are the fastest of the given number of repeats.
+
+    Preconditions:
+    - spec is a spec in the format of a1_sweep
+    - repeats >= 1
+    """
+    from a1_sweep import build_config
+
+    best_time = float('inf')
+    num_people = 0
+    for _ in range(repeats):
+        generator = build_config(spec)['arrival_generator']
+        num_people = 0
+        start_time = time.perf_counter()
+        for round_num in range(spec['num_rounds']):
+            for people in generator.generate(round_num).values():
+                num_people += len(people)
+        best_time = min(best_time, time.perf_counter() - start_time)
+        generator.close()
+
+    return {
+        'rounds_per_second': spec['num_rounds'] / best_time,
+        'people_per_second': num_people / best_time
+    }
+
+
+def compare_results(old: dict[str, Any], new: dict[str, Any],
+                    tolerance: float = 0.1) -> list[dict[str, Any]]:
+    """Return a comparison of each metric of each benchmark in both of the given
+    results of run_suite.
+
+    Each row of the comparison has the benchmark, the metric, its old and new
+    values, the relative change, and whether the change is a regression: the metric
+    got worse by more than the given fraction of its old value.
+
+    >>> old = {'results': {'run/small/FurthestFloor': {'rounds_per_second': 1000.0,
+    ...                                                 'peak_memory': 5000}}}
+    >>> new = {'results': {'run/small/FurthestFloor': {'rounds_per_second': 800.0,
+    ...                                                 'peak_memory': 5100}}}
+    >>> [(row['metric'], row['regression']) for row in compare_results(old, new)]
+    [('rounds_per_second', True), ('peak_memory', False)]
+    """
+    rows = []
+    for benchmark, old_metrics in old['results'].items():
+        new_metrics = new['results'].get(benchmark, {})
+        for metric, higher_is_better in _METRICS.items():
+            if metric not in old_metrics or metric not in new_metrics or \
+                    old_metrics[metric] == 0:
+                continue
+            change = new_metrics[metric] / old_metrics[metric] - 1
+            rows.append({
+                'benchmark': benchmark,
+                'metric': metric,
+                'old': old_metrics[metric],
+                'new': new_metrics[metric],
+                'change': change,
+                'regression': -change > tolerance if higher_is_better else change > tolerance
+            })
+    return rows
+
+
+def _scenario_spec(name: str, algorithm_name: str, directory: str,
+                   scale: float) -> dict[str, Any]:
+    """Return the spec for running the given scenario with the given moving algorithm,
+    with the scenario's number of rounds multiplied by scale (but at least 1).
+
+    If the scenario records a trace, the trace is written to the given directory the
+    first time, and the spec replays it.
+    """
+    from a1_sweep import build_config
+
+    spec = dict(SCENARIOS[name])
+    spec['num_rounds'] = max(1, int(spec['num_rounds'] * scale))
+    spec['moving_algorithm'] = algorithm_name
+    if spec.pop('record_trace', False):
+        from a1_traces import record_arrivals
+
+        trace_path = os.path.join(directory, f'{name}.trace')
+        if not os.path.exists(trace_path):
+            generator = build_config(spec)['arrival_generator']
+            record_arrivals(generator, spec['num_rounds'], trace_path)
+        spec['arrival_generator'] = {'name': 'TraceArrivals', 'filename': trace_path}
+    return spec
+
+
+def _build_simulation(spec: dict[str, Any]) -> Any:
+    """Return a new headless Simulation for the given spec, seeded as a1_sweep does."""
+    from a1_simulation import Simulation
+    from a1_sweep import build_config
+
+    random.seed(spec['seed'])
+    return Simulation(build_config(spec))
+
+
+def _git_commit() -> Optional[str]:
+    """Return the git commit of this module's directory, or None if it is unknown."""
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the simulation benchmarks.')
+    parser.add_argument('--suite', action='store_true',
+                        help='run the benchmark suite instead of the microbenchmarks')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='run only this scenario of the suite (may be repeated)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply the number of rounds of each scenario by this')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='time each benchmark this many times, and keep the fastest')
+    parser.add_argument('--output', help='save the results of the suite to this JSON file')
+    parser.add_argument('--compare', help='compare the results of the suite with the '
+                                          'results saved in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='the relative change in a metric that counts as a regression')
+    args = parser.parse_args()
+
+    if not args.suite:
+        headless_rate = bench_person_creation(100000, False)
+        print(f'Person creation (headless):   {headless_rate:12,.0f} people/s')
+        visual_rate = bench_person_creation(2000, True)
+        print(f'Person creation (visualized): {visual_rate:12,.0f} people/s')
+        for layout, size in bench_person_memory(1000000).items():
+            print(f'1,000,000 waiting people ({layout}): {size:6.1f} bytes/person')
+
+        import_time, loaded_pygame = bench_import_time('a1_simulation')
+        print(f'import a1_simulation:         {import_time * 1000:12.1f} ms '
+              f'(pygame imported: {loaded_pygame})')
+
+        contract_rates = bench_contracts(500)
+        print(f'Simulation (contracts off):   {contract_rates["off"]:12,.0f} rounds/s')
+        print(f'Simulation (contracts on):    {contract_rates["on"]:12,.0f} rounds/s')
+
+        engine_rates = bench_engines(200, 50, 100.0, 2000)
+        for algorithm_name, rates in engine_rates.items():
+            for engine_name, rate in rates.items():
+                print(f'200 floors, 50 elevators, {algorithm_name} ({engine_name}): '
+                      f'{rate:,.0f} rounds/s')
+            print(f'  speedup {rates["VectorizedSimulation"] / rates["Simulation"]:.2f}x '
+                  f'(at least {ENGINE_SPEEDUP:.2f}x expected)')
+
+        furthest_rates = bench_furthest_floor(500, 64, 2000)
+        for layout, rate in furthest_rates.items():
+            print(f'FurthestFloor, 500 floors, 64 elevators ({layout}): {rate:,.0f} updates/s')
+
+        dispatch_times = bench_nearest_car(300, 64, 5.0, 2000)
+        print('NearestCar, 300 floors, 64 elevators: '
+              + ', '.join(f'{name} {value * 1000:.2f} ms' for name, value in dispatch_times.items())
+              + f' (budget {NEAREST_CAR_BUDGET * 1000:.2f} ms)')
+
+        travel_results = bench_rush_hour(40, 12, 2.0, 5000)
+        for algorithm_name, travel in travel_results.items():
+            print(f'Up-peak, 40 floors, 12 elevators ({algorithm_name}): '
+                  f'avg_time {travel["avg_time"]}, travel {travel["travel"]:,} floors '
+                  f'({travel["empty_travel"]:,} empty)')
+
+        load_times = bench_arrival_files(20000, 20)
+        for generator_name, load_time in load_times.items():
+            print(f'20,000 rounds x 20 people ({generator_name}): {load_time * 1000:,.0f} ms')
+    else:
+        suite_results = run_suite(args.scenario, args.scale, args.repeats)
+        for benchmark_name, metrics in suite_results['results'].items():
+            print(f'{benchmark_name:40}' + ', '.join(
+                f'{metric} {value:,.0f}' for metric, value in metrics.items()))
+        if args.output:
+            with open(args.output, 'w') as output_file:
+                json.dump(suite_results, output_file, indent=2)
+
+        if args.compare:
+            with open(args.compare) as baseline_file:
+                baseline = json.load(baseline_file)
+            comparison = compare_results(baseline, suite_results, args.tolerance)
+            print(f'\nCompared with commit {baseline["metadata"]["commit"]}:')
+            for row in comparison:
+                flag = '  REGRESSION' if row['regression'] else ''
+                print(f'{row["benchmark"]:40}{row["metric"]:20}{row["old"]:>16,.0f}'
+                      f'{row["new"]:>16,.0f}{row["change"]:>+9.1%}{flag}')
+            if any(row['regression'] for row in comparison):
+                sys.exit(1)
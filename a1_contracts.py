@@ -0,0 +1,38 @@
+"""CSC148 Assignment 1 - Contract checking switch
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+python_ta's check_contracts decorator re-checks type annotations, preconditions
+and representation invariants on every method call and attribute assignment.
+That is very useful while debugging, but it dominates the running time of long
+simulations.
+
+This module provides the check_contracts decorator used by the rest of the
+simulation. It is python_ta's decorator only when contract checking is turned
+on, by setting the A1_CHECK_CONTRACTS environment variable to 1 before the
+simulation modules are imported:
+
+    A1_CHECK_CONTRACTS=1 python -m pytest a1_sample_test.py
+
+Otherwise it leaves classes unchanged, and python_ta is never imported.
+"""
+import os
+from typing import Any
+
+# Whether python_ta contract checking is installed on the simulation classes
+CONTRACTS_ENABLED = os.environ.get('A1_CHECK_CONTRACTS', '0').strip().lower() \
+    not in ('', '0', 'false', 'no', 'off')
+
+if CONTRACTS_ENABLED:
+    from python_ta.contracts import check_contracts
+else:
+    def check_contracts(func_or_class: Any) -> Any:
+        """Return the given class or function unchanged.
+
+        This stands in for python_ta's check_contracts when contract checking
+        is turned off.
+        """
+        return func_or_class
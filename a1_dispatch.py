@@ -0,0 +1,404 @@
+"""CSC148 Assignment 1 - Dispatch algorithms
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains two moving algorithms that decide where elevators go based
+on where people are waiting and where their passengers want to go:
+- NearestCar sends the elevator that can get there soonest to each floor where
+  people are waiting.
+- CollectiveLook sweeps each elevator up and down the building, turning around at
+  the last floor anyone has asked for.
+
+NearestCar estimates how many rounds each elevator would take to reach each
+floor (the elevator's cost for that floor), and keeps these estimates in a cost
+matrix with one row per elevator. An elevator's row only depends on its current
+floor, its target floor, and whether it is empty, full or neither, so a row is
+only worked out again when that state changes, and all the changed rows are
+worked out at once with NumPy. New and finished hall calls only change which
+columns of the matrix are read. This saves the rows of idle elevators, but every
+moving elevator's state changes each round, so in busy traffic nearly every row
+is worked out again: a round still takes time proportional to the number of
+elevators times the number of floors.
+
+CollectiveLook finds each elevator's next stop without looking through the
+waiting people: the floors where people are waiting are kept sorted by the
+simulation's WaitingRoom as people come and go, so the nearest one in either
+direction is found by binary search, and the passengers' target floors are kept
+as a bitmap, so the nearest one is found with a few bit operations.
+"""
+from __future__ import annotations
+import bisect
+from typing import Optional, Sequence
+
+import numpy as np
+
+from a1_contracts import check_contracts
+from a1_algorithms import BuildingSnapshot, MovingAlgorithm
+from a1_entities import Elevator, Person
+
+# The load of an elevator, as stored in the state it was costed for
+_EMPTY, _PARTLY_FULL, _FULL = 0, 1, 2
+# A cost higher than any real cost, for elevators that cannot be chosen
+_NO_ROOM = np.iinfo(np.int32).max
+
+
+@check_contracts
+class _DispatchAlgorithm(MovingAlgorithm):
+    """A moving algorithm that is given a BuildingSnapshot each round, and only
+    changes the target floor of an empty elevator when someone is waiting.
+
+    This is an abstract class: subclasses implement update_from_snapshot.
+    """
+    uses_snapshot = True
+
+    def update_target_floors(self,
+                             elevators: list[Elevator],
+                             waiting: dict[int, Sequence[Person]],
+                             max_floor: int) -> None:
+        """Updates elevator target floors based on the algorithm's rules."""
+        self.update_from_snapshot(BuildingSnapshot(elevators, waiting, max_floor))
+
+    def update_from_snapshot(self, snapshot: BuildingSnapshot) -> None:
+        """Updates elevator target floors based on the algorithm's rules."""
+        raise NotImplementedError
+
+    def is_quiescent(self,
+                     elevators: list[Elevator],
+                     waiting: dict[int, Sequence[Person]],
+                     max_floor: int) -> bool:
+        """Return whether nobody is waiting for an elevator, and every empty elevator
+        is staying where it is.
+
+        An elevator with passengers keeps its target floor until it gets there, or
+        someone boards or leaves it.
+        """
+        return not BuildingSnapshot(elevators, waiting, max_floor).occupied_floors and all(
+            elevator.passengers or elevator.target_floor == elevator.current_floor
+            for elevator in elevators)
+
+
+@check_contracts
+class NearestCar(_DispatchAlgorithm):
+    """A moving algorithm that gives each floor where people are waiting (a hall
+    call) to the elevator that can reach it soonest.
+
+    Algorithm description:
+
+    - An elevator with passengers goes to the nearest floor that one of its
+      passengers wants in the direction it is already going. If there is none, it
+      turns around and goes to the nearest such floor in the other direction. An
+      elevator that has just picked up its first passengers goes to the nearest
+      floor they want (if there is a tie, the *lowest* floor).
+    - An elevator's cost for a floor is an estimate of the number of rounds it
+      would take to get there:
+        - For an empty elevator, the distance to the floor.
+        - For an elevator with passengers, the distance to the floor if the floor
+          is on the way to its target floor and the elevator is not full;
+          otherwise, the distance to its target floor and from there to the floor.
+    - Hall calls are handled in order of priority: the lowest cost of any elevator
+      for the call, minus how long the first person waiting there has waited
+      (lowest first; if there is a tie, the lowest floor first). So long waits
+      are served first, unless another call can be reached much sooner.
+    - Each hall call is given elevators until they have room for everyone
+      waiting there. Each time, the elevator with the lowest cost is chosen, among
+      the elevators with passengers that still have room (which pick people up on
+      their way without changing course) and the empty elevators that have not
+      been given a hall call yet. If there is a tie, the elevator that comes first
+      in the list of elevators is chosen. An empty elevator that is given a hall
+      call goes to its floor.
+    - An empty elevator that is not given a hall call stays where it is.
+
+    >>> elevators = [Elevator(2), Elevator(2), Elevator(2)]
+    >>> elevators[1].current_floor = 8
+    >>> elevators[2].current_floor = 4
+    >>> elevators[2].board(Person(1, 6))
+    >>> waiting = {floor: [] for floor in range(1, 11)}
+    >>> waiting[2].append(Person(2, 1))
+    >>> waiting[5].append(Person(5, 1))
+    >>> waiting[9].append(Person(9, 1))
+    >>> NearestCar().update_target_floors(elevators, waiting, 10)
+    >>> [elevator.target_floor for elevator in elevators]
+    [2, 9, 6]
+    """
+    def __init__(self) -> None:
+        """Initialize a new NearestCar algorithm, with no costs worked out yet."""
+        # The cost matrix: _costs[e, f] is elevator e's cost for floor f (column 0 is
+        # unused). Row e was worked out for the state _states[e]: the elevator's
+        # current floor, target floor and load.
+        self._costs = np.zeros((0, 0), dtype=np.int32)
+        self._states = []
+        self._floor_numbers = np.zeros(0, dtype=np.int32)
+
+        # _directions[e] is 1 if elevator e is taking passengers up, -1 if it is
+        # taking them down, and 0 if it is empty
+        self._directions = []
+
+    def update_from_snapshot(self, snapshot: BuildingSnapshot) -> None:
+        """Updates elevator target floors based on the algorithm's rules."""
+        elevators = snapshot.elevators
+        if len(self._directions) != len(elevators) \
+                or len(self._floor_numbers) != snapshot.max_floor + 1:
+            self._reset(len(elevators), snapshot.max_floor)
+
+        self._route_passengers(elevators, snapshot.passenger_targets)
+        loads = [_EMPTY if load == 0 else _FULL if load == elevator.capacity else _PARTLY_FULL
+                 for elevator, load in zip(elevators, snapshot.elevator_loads)]
+        self._update_costs(elevators, loads)
+        self._assign_calls(elevators, loads, snapshot)
+
+    def _reset(self, num_elevators: int, max_floor: int) -> None:
+        """Forget all costs and directions, for a building with the given number of
+        elevators and floors.
+        """
+        self._costs = np.zeros((num_elevators, max_floor + 1), dtype=np.int32)
+        # No elevator is ever costed for this state, so every row is worked out
+        self._states = [None] * num_elevators
+        self._floor_numbers = np.arange(max_floor + 1, dtype=np.int32)
+        self._directions = [0] * num_elevators
+
+    def _route_passengers(self, elevators: list[Elevator], passenger_targets: list[int]) -> None:
+        """Set the target floor and direction of each elevator with passengers, given
+        its passengers' target floors as a bitmap (see BuildingSnapshot).
+        """
+        for index, elevator in enumerate(elevators):
+            targets = passenger_targets[index]
+            if not targets:
+                self._directions[index] = 0
+                continue
+
+            current = elevator.current_floor
+            nearest_above = _lowest_floor_above(targets, current)
+            nearest_below = _highest_floor_below(targets, current)
+
+            direction = self._directions[index]
+            if nearest_above is not None and (
+                    direction == 1 or nearest_below is None
+                    or (direction == 0 and nearest_above - current < current - nearest_below)):
+                elevator.target_floor = nearest_above
+                self._directions[index] = 1
+            elif nearest_below is not None:
+                elevator.target_floor = nearest_below
+                self._directions[index] = -1
+            else:
+                # Everyone on board wants the current floor
+                elevator.target_floor = current
+
+    def _update_costs(self, elevators: list[Elevator], loads: list[int]) -> None:
+        """Work out again the cost matrix rows of the elevators whose current floor,
+        target floor or load has changed since their row was last worked out.
+
+        This includes every elevator that moved since the last round, so it is
+        only cheaper than working out the whole matrix when some elevators are idle.
+        """
+        changed = []
+        for index, elevator in enumerate(elevators):
+            state = (elevator.current_floor, elevator.target_floor, loads[index])
+            if state != self._states[index]:
+                self._states[index] = state
+                changed.append(index)
+        if not changed:
+            return
+
+        states = np.array([self._states[index] for index in changed], dtype=np.int32)
+        current, target, load = states[:, 0:1], states[:, 1:2], states[:, 2:3]
+        floors = self._floor_numbers
+
+        distance = np.abs(floors - current)
+        via_target = np.abs(target - current) + np.abs(floors - target)
+        on_way = (load != _FULL) & (floors >= np.minimum(current, target)) \
+            & (floors <= np.maximum(current, target))
+        self._costs[changed] = np.where((load == _EMPTY) | on_way, distance, via_target)
+
+    def _assign_calls(self, elevators: list[Elevator], loads: list[int],
+                      snapshot: BuildingSnapshot) -> None:
+        """Give each hall call in the given snapshot to elevators, and set the target
+        floor of each empty elevator to the floor of its hall call, or to its current
+        floor if it has none.
+        """
+        idle = [index for index, load in enumerate(loads) if load == _EMPTY]
+        for index in idle:
+            elevators[index].target_floor = elevators[index].current_floor
+        calls = snapshot.occupied_floors
+        if not calls or not idle:
+            return
+
+        costs = self._costs[:, calls]
+        waiting = snapshot.waiting
+        priorities = costs.min(axis=0) - [waiting[floor][0].wait_time for floor in calls]
+
+        # The room each elevator has for people from the hall calls still to be
+        # handled. An empty elevator's room drops to 0 once it is given a hall call.
+        # available is costs, with the rows of the elevators with no room replaced
+        # by _NO_ROOM, so they are never chosen.
+        room = [elevator.capacity - load
+                for elevator, load in zip(elevators, snapshot.elevator_loads)]
+        available = costs.copy()
+        available[[index for index, space in enumerate(room) if space == 0]] = _NO_ROOM
+        num_with_room = sum(1 for space in room if space > 0)
+        num_idle = len(idle)
+
+        best = available.argmin(axis=0).tolist()
+        for call in np.argsort(priorities, kind='stable').tolist():
+            floor = calls[call]
+            demand = len(waiting[floor])
+            index = best[call]
+            while demand > 0:
+                if room[index] == 0:
+                    # The elevator chosen last time has no room left, so find the
+                    # elevator with the lowest cost among those that do
+                    if num_with_room == 0:
+                        return
+                    index = int(available[:, call].argmin())
+
+                if loads[index] == _EMPTY:
+                    elevators[index].target_floor = floor
+                    demand -= room[index]
+                    room[index] = 0
+                    num_idle -= 1
+                    if num_idle == 0:
+                        return
+                else:
+                    taken = min(demand, room[index])
+                    demand -= taken
+                    room[index] -= taken
+                if room[index] == 0:
+                    available[index] = _NO_ROOM
+                    num_with_room -= 1
+
+
+@check_contracts
+class CollectiveLook(_DispatchAlgorithm):
+    """A moving algorithm that sweeps each elevator up and down the building, and
+    turns it around at the last floor anyone has asked for in its direction (like
+    the LOOK disk scheduling algorithm).
+
+    Algorithm description:
+
+    - An elevator's stops are the floors its passengers want to go to, and the
+      floors where anyone is waiting.
+    - Each elevator has a direction: up, down, or none.
+    - An elevator going up goes to its nearest stop above its current floor. If it
+      has none, it turns around: it goes down to its nearest stop below its
+      current floor. An elevator going down does the same, the other way around.
+    - An elevator with no direction goes to its nearest stop, and takes the
+      direction of that stop. If there is a tie, it goes down to the *lower* floor.
+    - An elevator with no stops (apart from its current floor) stays where it is,
+      and has no direction.
+
+    >>> elevators = [Elevator(2), Elevator(2)]
+    >>> elevators[0].current_floor = 5
+    >>> elevators[0].board(Person(1, 3))
+    >>> elevators[1].current_floor = 4
+    >>> waiting = {floor: [] for floor in range(1, 11)}
+    >>> waiting[7].append(Person(7, 1))
+    >>> look = CollectiveLook()
+    >>> look.update_target_floors(elevators, waiting, 10)
+    >>> [elevator.target_floor for elevator in elevators]
+    [3, 7]
+    >>> _ = waiting[7].pop()
+    >>> waiting[2].append(Person(2, 10))
+    >>> look.update_target_floors(elevators, waiting, 10)
+    >>> [elevator.target_floor for elevator in elevators]
+    [3, 2]
+    """
+    def __init__(self) -> None:
+        """Initialize a new CollectiveLook algorithm, with no elevator going anywhere."""
+        # _directions[e] is 1 if elevator e is going up, -1 if it is going down, and
+        # 0 if it has no direction
+        self._directions = []
+
+    def update_from_snapshot(self, snapshot: BuildingSnapshot) -> None:
+        """Updates elevator target floors based on the algorithm's rules."""
+        elevators = snapshot.elevators
+        if len(self._directions) != len(elevators):
+            self._directions = [0] * len(elevators)
+        calls = snapshot.occupied_floors
+        passenger_targets = snapshot.passenger_targets
+
+        for index, elevator in enumerate(elevators):
+            current = elevator.current_floor
+            above = _stop_above(calls, passenger_targets[index], current)
+            below = _stop_below(calls, passenger_targets[index], current)
+
+            direction = self._directions[index]
+            if direction == 0 and above is not None and below is not None:
+                direction = 1 if above - current < current - below else -1
+            if above is not None and (direction == 1 or below is None):
+                elevator.target_floor = above
+                self._directions[index] = 1
+            elif below is not None:
+                elevator.target_floor = below
+                self._directions[index] = -1
+            else:
+                elevator.target_floor = current
+                self._directions[index] = 0
+
+
+def _stop_above(calls: list[int], targets: int, floor: int) -> Optional[int]:
+    """Return the lowest floor above the given floor that is in calls (a sorted list)
+    or in targets (a bitmap of floors), or None if there is none.
+
+    >>> _stop_above([2, 8], 0b1000000, 3)
+    6
+    >>> _stop_above([2, 8], 0, 8) is None
+    True
+    """
+    index = bisect.bisect_right(calls, floor)
+    stop = calls[index] if index < len(calls) else None
+
+    target = _lowest_floor_above(targets, floor)
+    if target is not None and (stop is None or target < stop):
+        stop = target
+    return stop
+
+
+def _stop_below(calls: list[int], targets: int, floor: int) -> Optional[int]:
+    """Return the highest floor below the given floor that is in calls (a sorted list)
+    or in targets (a bitmap of floors), or None if there is none.
+
+    >>> _stop_below([2, 8], 0b1000, 5)
+    3
+    >>> _stop_below([2, 8], 0, 2) is None
+    True
+    """
+    index = bisect.bisect_left(calls, floor)
+    stop = calls[index - 1] if index > 0 else None
+
+    target = _highest_floor_below(targets, floor)
+    if target is not None and (stop is None or target > stop):
+        stop = target
+    return stop
+
+
+def _lowest_floor_above(floors: int, floor: int) -> Optional[int]:
+    """Return the lowest floor above the given floor in floors (a bitmap of floors),
+    or None if there is none.
+
+    >>> _lowest_floor_above(0b1001000, 3), _lowest_floor_above(0b1000, 3)
+    (6, None)
+    """
+    above = floors >> (floor + 1)
+    if not above:
+        return None
+    return floor + (above & -above).bit_length()
+
+
+def _highest_floor_below(floors: int, floor: int) -> Optional[int]:
+    """Return the highest floor below the given floor in floors (a bitmap of floors),
+    or None if there is none.
+
+    >>> _highest_floor_below(0b1001000, 6), _highest_floor_below(0b1000, 3)
+    (3, None)
+    """
+    below = floors & ((1 << floor) - 1)
+    if not below:
+        return None
+    return below.bit_length() - 1
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
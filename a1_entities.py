@@ -15,25 +15,58 @@ methods we have provided. However, you can add new PRIVATE attributes,
 and of course you'll have to implement the methods we've provided, as well
 as add your own methods to complete this assignment.
 
-Person and Elevator each inherit from a "sprite" class found in visualizer.py.
-This is to enable their instances to be visualized properly.
-You may not change visualizer.py, but are responsible for reading the documentation
-to understand these classes, as well as the abstract methods your classes must
-implement.
+It also contains WaitingQueue, the queue of people waiting on one floor, and
+WaitingRoom, which holds the queues for every floor of a building.
+
+Person and Elevator are plain models that never touch Pygame, so creating them
+is cheap in headless runs. When a simulation is visualized, the Visualizer in
+a1_visualizer.py attaches a sprite to each person and elevator it is shown, and
+draws them using get_anger_level and fullness.
 """
 from __future__ import annotations
-from python_ta.contracts import check_contracts
-from a1_visualizer import PersonSprite, ElevatorSprite
+import bisect
+from collections import deque
+from typing import Any, Optional
+
+from a1_contracts import CONTRACTS_ENABLED, check_contracts
 
 
 @check_contracts
-class Person(PersonSprite):
+class RoundClock:
+    """A count of the rounds of waiting that have passed in a simulation.
+
+    Everyone who is waiting in a simulation (on a floor or on an elevator) shares
+    that simulation's clock, and works out their wait time from it when asked.
+    Advancing the clock by one therefore adds a round to everyone's wait time at
+    once, without touching any Person.
+
+    Instance Attributes:
+    - round_num: the number of rounds of waiting that have passed
+
+    Representation Invariants:
+    - self.round_num >= 0
+    """
+    round_num: int
+
+    def __init__(self, round_num: int = 0) -> None:
+        """Initialize a new clock at the given round.
+
+        Preconditions:
+        - round_num >= 0
+        """
+        self.round_num = round_num
+
+
+@check_contracts
+class Person:
     """A person in the elevator simulation.
 
     Instance Attributes:
     - start: the floor this person started on
     - target: the floor this person wants to go to
-    - wait_time: the number of rounds this person has been waiting
+    - wait_time: the number of rounds this person has been waiting.
+        While a person is waiting in a simulation, this is calculated from the
+        simulation's RoundClock and the round they arrived in.
 
     Representation Invariants:
     - self.start >= 1
@@ -45,6 +78,14 @@ class Person(PersonSprite):
     target: int
     wait_time: int
 
+    # A long simulation can have millions of people in it at once, so each person
+    # stores its attributes in slots rather than in an instance dictionary. Nothing
+    # else (such as a sprite) is ever stored on a person. python_ta's contract
+    # checking stores its own bookkeeping on each instance, so while it is turned
+    # on, people keep their instance dictionaries.
+    if not CONTRACTS_ENABLED:
+        __slots__ = ('start', 'target', '_clock', '_waiting_since', '_wait_time')
+
     def __init__(self, start: int, target: int) -> None:
         """Initialize a person with the given start and target floor.
 
@@ -53,15 +94,83 @@ class Person(PersonSprite):
         Preconditions:
         - start >= 0
         - target >= 0
-
-        NOTE: Initialize all Person instance attributes BEFORE calling PersonSprite.__init__.
-        This is because the PersonSprite initializer will call get_anger_level, which
-        should depend on self.wait_time.
         """
         self.start = start
         self.target = target
-        self.wait_time = 0
-        super().__init__()
+
+        # This person's wait time is self._wait_time, plus (while they are waiting in
+        # a simulation) the number of rounds self._clock has advanced since
+        # self._waiting_since, the clock's round when they arrived.
+        self._clock = None
+        self._waiting_since = 0
+        self._wait_time = 0
+
+    @property
+    def wait_time(self) -> int:
+        """Return the number of rounds this person has been waiting."""
+        if self._clock is None:
+            return self._wait_time
+        return self._wait_time + self._clock.round_num - self._waiting_since
+
+    @wait_time.setter
+    def wait_time(self, value: int) -> None:
+        """Set the number of rounds this person has been waiting."""
+        self._wait_time = value
+        if self._clock is not None:
+            self._waiting_since = self._clock.round_num
+
+    def start_waiting(self, clock: RoundClock) -> None:
+        """Start counting this person's wait time using the given simulation clock.
+
+        Called by the simulation when this person arrives.
+        """
+        self._wait_time = self.wait_time
+        self._clock = clock
+        self._waiting_since = clock.round_num
+
+    def stop_waiting(self) -> None:
+        """Stop counting this person's wait time, keeping its current value.
+
+        Called by the simulation when this person reaches their target floor.
+
+        >>> clock = RoundClock()
+        >>> my_person = Person(1, 5)
+        >>> my_person.start_waiting(clock)
+        >>> clock.round_num += 3
+        >>> my_person.stop_waiting()
+        >>> clock.round_num += 1
+        >>> my_person.wait_time
+        3
+        """
+        self._wait_time = self.wait_time
+        self._clock = None
+
+    def own(self, clock: RoundClock) -> Person:
+        """Return this person if their wait time is counted on the given clock.
+        Otherwise, return a copy of this person whose wait time is counted on the
+        given clock, from the same round.
+
+        When a simulation is forked, the people in it are shared by both
+        simulations, and count their wait times on a clock that each simulation
+        keeps at its own round while it runs (see Simulation.fork). Each simulation
+        calls this before changing a person, so the other simulation never sees
+        the change.
+
+        >>> clock = RoundClock(10)
+        >>> my_person = Person(1, 5)
+        >>> my_person.start_waiting(clock)
+        >>> branch_clock = RoundClock(10)
+        >>> branch_clock.round_num += 4
+        >>> my_person.own(branch_clock).wait_time, my_person.wait_time
+        (4, 0)
+        """
+        if self._clock is clock:
+            return self
+        person = Person(self.start, self.target)
+        person._wait_time = self._wait_time
+        person._waiting_since = self._waiting_since
+        person._clock = clock if self._clock is not None else None
+        return person
 
     def get_anger_level(self) -> int:
         """Return this person's anger level.
@@ -74,8 +183,8 @@ class Person(PersonSprite):
         - Level 3: waiting 7-8 rounds
         - Level 4: waiting >= 9 rounds
 
-        Note: this method overrides PersonSprite.get_anger_level, used when
-        visualizing a person (how?).
+        Note: the visualizer uses this method to pick the image drawn for
+        this person.
 
         >>> my_person = Person(1, 5)
         >>> my_person.wait_time = 5
@@ -108,7 +217,7 @@ class Person(PersonSprite):
 
 
 @check_contracts
-class Elevator(ElevatorSprite):
+class Elevator:
     """An elevator in the elevator simulation.
 
     Remember to add additional documentation to this class docstring
@@ -117,9 +226,7 @@ class Elevator(ElevatorSprite):
     Instance Attributes:
     - capacity: The maximum number of people on this elevator
     - current_floor: The floor this elevator is on
-    - passengers:
-        The passengers of this elevator (this attribute also appears in
-        the ElevatorSprite class)
+    - passengers: The passengers of this elevator
     - target_floor: the floor this elevator is headed towards
 
     Representation Invariants:
@@ -145,15 +252,105 @@ class Elevator(ElevatorSprite):
         self.current_floor = 1
         self.passengers = []
         self.target_floor = 1
-        super().__init__()
+
+        # This elevator's passengers grouped by target floor, each group in boarding
+        # order. The index covers the list object self._indexed_passengers when it held
+        # self._num_indexed people; if self.passengers is changed other than through
+        # board and disembark, the index is rebuilt the next time it is used.
+        self._passengers_by_target = {}
+        self._indexed_passengers = self.passengers
+        self._num_indexed = 0
+
+    def board(self, person: Person) -> None:
+        """Add the given person to this elevator's passengers.
+
+        Preconditions:
+        - len(self.passengers) < self.capacity
+        """
+        self._sync_passenger_index()
+        self.passengers.append(person)
+        self._passengers_by_target.setdefault(person.target, []).append(person)
+        self._num_indexed += 1
+
+    def disembark(self) -> list[Person]:
+        """Remove and return the passengers whose target floor is this elevator's
+        current floor, in the order they boarded.
+
+        Only the passengers for the current floor are looked at, unless some of
+        them are leaving, in which case the remaining passengers are kept in order.
+
+        >>> my_elevator = Elevator(3)
+        >>> my_elevator.board(Person(1, 2))
+        >>> my_elevator.board(Person(1, 3))
+        >>> my_elevator.current_floor = 2
+        >>> my_elevator.disembark()
+        [Person(start=1, target=2, wait_time=0)]
+        >>> my_elevator.passengers
+        [Person(start=1, target=3, wait_time=0)]
+        """
+        self._sync_passenger_index()
+        leaving = self._passengers_by_target.pop(self.current_floor, None)
+        if leaving is None:
+            return []
+
+        if len(leaving) == len(self.passengers):
+            self.passengers.clear()
+        else:
+            self.passengers[:] = [passenger for passenger in self.passengers
+                                  if passenger.target != self.current_floor]
+        self._num_indexed = len(self.passengers)
+        return leaving
+
+    def has_passenger_for(self, floor: int) -> bool:
+        """Return whether any of this elevator's passengers wants to go to the given floor."""
+        self._sync_passenger_index()
+        return floor in self._passengers_by_target
+
+    def passenger_target_floors(self) -> list[int]:
+        """Return the floors that this elevator's passengers want to go to, each once.
+
+        >>> my_elevator = Elevator(3)
+        >>> for target in (4, 2, 4):
+        ...     my_elevator.board(Person(1, target))
+        >>> my_elevator.passenger_target_floors()
+        [4, 2]
+        """
+        self._sync_passenger_index()
+        return list(self._passengers_by_target)
+
+    def _sync_passenger_index(self) -> None:
+        """Rebuild the index of passengers by target floor, if self.passengers has
+        been changed other than through board and disembark.
+        """
+        if self._indexed_passengers is self.passengers \
+                and self._num_indexed == len(self.passengers):
+            return
+
+        self._passengers_by_target = {}
+        for passenger in self.passengers:
+            self._passengers_by_target.setdefault(passenger.target, []).append(passenger)
+        self._indexed_passengers = self.passengers
+        self._num_indexed = len(self.passengers)
+
+    def copy(self) -> Elevator:
+        """Return a new elevator with the same capacity, current and target floors, and
+        passengers as this one.
+
+        The passengers list is copied, but the passengers themselves are shared.
+        """
+        elevator = Elevator(self.capacity)
+        elevator.current_floor = self.current_floor
+        elevator.target_floor = self.target_floor
+        elevator.passengers = list(self.passengers)
+        return elevator
 
     def fullness(self) -> float:
         """Return the fraction that this elevator is filled.
 
         The value returned should be a float between 0.0 (empty) and 1.0 (full).
 
-        Note: this method overrides ElevatorSprite.fullness, used when
-        visualizing an elevator (how?).
+        Note: the visualizer uses this method to draw how full this
+        elevator is.
 
         >>> my_elevator = Elevator(10)
         >>> my_elevator.fullness()
@@ -162,6 +359,249 @@ class Elevator(ElevatorSprite):
         return len(self.passengers) / self.capacity
 
 
+class WaitingQueue(deque):
+    """A first-in, first-out queue of the people waiting on one floor.
+
+    Removing the person at the front of the queue (popleft, or pop(0)) takes
+    constant time, however long the queue is. Otherwise, a WaitingQueue can be
+    used like the list of people it stands in for: it supports len, truth
+    testing, iteration, indexing (including slices), in, append and extend, and
+    compares equal to a list of the same people in the same order.
+
+    A queue that belongs to a WaitingRoom tells the room whenever it becomes
+    empty or stops being empty.
+
+    >>> queue = WaitingQueue()
+    >>> queue.extend([1, 2, 3])
+    >>> queue.pop(0)
+    1
+    >>> queue == [2, 3]
+    True
+    >>> queue[:1]
+    [2]
+    """
+    def __init__(self, people: Any = (), *, room: Optional[WaitingRoom] = None,
+                 floor: int = 0) -> None:
+        """Initialize a queue of the given people, in order.
+
+        If room is given, this is the queue for the given floor of that room.
+        """
+        self._room = room
+        self._floor = floor
+        super().__init__(people)
+
+    def __getitem__(self, index: Any) -> Any:
+        """Return the person at the given index, or a list of people if index is a slice."""
+        if isinstance(index, slice):
+            return list(self)[index]
+        return super().__getitem__(index)
+
+    def __eq__(self, other: Any) -> bool:
+        """Return whether this queue has the same people, in the same order, as other."""
+        if isinstance(other, list):
+            return list(self) == other
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        """Return a string representation of this queue, in the same format as a list."""
+        return repr(list(self))
+
+    ###########################################################################
+    # Methods that add people
+    ###########################################################################
+    def append(self, person: Any) -> None:
+        """Add the given person to the back of the queue."""
+        super().append(person)
+        if len(self) == 1:
+            self._notify_occupied()
+
+    def appendleft(self, person: Any) -> None:
+        """Add the given person to the front of the queue."""
+        super().appendleft(person)
+        if len(self) == 1:
+            self._notify_occupied()
+
+    def extend(self, people: Any) -> None:
+        """Add the given people to the back of the queue, in order."""
+        was_empty = not self
+        super().extend(people)
+        if was_empty and self:
+            self._notify_occupied()
+
+    def extendleft(self, people: Any) -> None:
+        """Add the given people to the front of the queue, one at a time."""
+        was_empty = not self
+        super().extendleft(people)
+        if was_empty and self:
+            self._notify_occupied()
+
+    def insert(self, index: int, person: Any) -> None:
+        """Insert the given person at the given index."""
+        super().insert(index, person)
+        if len(self) == 1:
+            self._notify_occupied()
+
+    def __iadd__(self, people: Any) -> WaitingQueue:
+        """Add the given people to the back of the queue, in order."""
+        self.extend(people)
+        return self
+
+    ###########################################################################
+    # Methods that remove people
+    ###########################################################################
+    def popleft(self) -> Any:
+        """Remove and return the person at the front of the queue."""
+        person = super().popleft()
+        if not self:
+            self._notify_empty()
+        return person
+
+    def pop(self, index: int = -1) -> Any:
+        """Remove and return the person at the given index (by default, the back of the queue).
+
+        This takes constant time for the front and back of the queue.
+        """
+        if index == 0:
+            return self.popleft()
+        if index == -1:
+            person = super().pop()
+        else:
+            person = super().__getitem__(index)
+            super().__delitem__(index)
+        if not self:
+            self._notify_empty()
+        return person
+
+    def remove(self, person: Any) -> None:
+        """Remove the first occurrence of the given person from the queue."""
+        super().remove(person)
+        if not self:
+            self._notify_empty()
+
+    def __delitem__(self, index: int) -> None:
+        """Remove the person at the given index."""
+        super().__delitem__(index)
+        if not self:
+            self._notify_empty()
+
+    def clear(self) -> None:
+        """Remove everyone from the queue."""
+        was_empty = not self
+        super().clear()
+        if not was_empty:
+            self._notify_empty()
+
+    ###########################################################################
+    # Helpers
+    ###########################################################################
+    def _notify_occupied(self) -> None:
+        """Tell this queue's room, if any, that someone is now waiting here."""
+        if self._room is not None:
+            self._room.floor_occupied(self._floor)
+
+    def _notify_empty(self) -> None:
+        """Tell this queue's room, if any, that nobody is waiting here any more."""
+        if self._room is not None:
+            self._room.floor_emptied(self._floor)
+
+
+class WaitingRoom(dict):
+    """The people waiting for an elevator on every floor of a building.
+
+    This is a dictionary mapping each floor number to the WaitingQueue of people
+    waiting on that floor. It also keeps a sorted list of the floors where anyone
+    is waiting, which its queues keep up to date as people join and leave them.
+
+    >>> room = WaitingRoom(5)
+    >>> room[4].append(Person(4, 1))
+    >>> room[2].extend([Person(2, 1), Person(2, 5)])
+    >>> room.occupied_floors()
+    [2, 4]
+    >>> room[4].popleft()
+    Person(start=4, target=1, wait_time=0)
+    >>> room.occupied_floors()
+    [2]
+    """
+    def __init__(self, num_floors: int) -> None:
+        """Initialize an empty waiting room for floors 1 to num_floors, inclusive.
+
+        Preconditions:
+        - num_floors >= 1
+        """
+        super().__init__()
+        self._occupied = []
+        for floor_num in range(1, num_floors + 1):
+            self[floor_num] = WaitingQueue(room=self, floor=floor_num)
+
+    def __setitem__(self, floor_num: int, people: Any) -> None:
+        """Make the given people, in order, the people waiting on the given floor.
+
+        people may be a list (or any other iterable of people), which is copied
+        into a new WaitingQueue for the floor, so later changes to the list itself
+        do not affect this room. The floor's old queue no longer belongs to this room.
+        The floor is added to or removed from occupied_floors as needed.
+        """
+        if not (isinstance(people, WaitingQueue) and people._room is self
+                and people._floor == floor_num):
+            people = WaitingQueue(people, room=self, floor=floor_num)
+
+        old_people = self.get(floor_num)
+        if old_people is people:
+            return
+        if old_people is not None:
+            old_people._room = None
+            if old_people:
+                self.floor_emptied(floor_num)
+        super().__setitem__(floor_num, people)
+        if people:
+            self.floor_occupied(floor_num)
+
+    def __reduce__(self) -> tuple:
+        """Return how to pickle this room: as a new, empty room for the same floors,
+        with each floor's queue then put back through __setitem__.
+        """
+        return self.__class__, (len(self),), None, None, iter(self.items())
+
+    def occupied_floors(self) -> list[int]:
+        """Return the floors where anyone is waiting, in increasing order.
+
+        This is the room's own list, kept up to date as people arrive and board;
+        do not mutate it.
+        """
+        return self._occupied
+
+    def copy(self) -> WaitingRoom:
+        """Return a new waiting room with a copy of each of this room's queues.
+
+        The people in the queues are shared.
+        """
+        room = WaitingRoom(len(self))
+        for floor_num, people in self.items():
+            room[floor_num].extend(people)
+        return room
+
+    def floor_occupied(self, floor_num: int) -> None:
+        """Record that someone is now waiting on the given floor.
+
+        Called by the floor's WaitingQueue; this takes O(log F) time to find the
+        floor's place in the sorted list. A floor already in the list is not added again.
+        """
+        index = bisect.bisect_left(self._occupied, floor_num)
+        if index == len(self._occupied) or self._occupied[index] != floor_num:
+            self._occupied.insert(index, floor_num)
+
+    def floor_emptied(self, floor_num: int) -> None:
+        """Record that nobody is waiting on the given floor any more.
+
+        Called by the floor's WaitingQueue.
+        """
+        index = bisect.bisect_left(self._occupied, floor_num)
+        if index < len(self._occupied) and self._occupied[index] == floor_num:
+            del self._occupied[index]
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -177,6 +617,6 @@ if __name__ == '__main__':
     # "Ctrl + /" or "⌘ + /".
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['a1_visualizer'],
+        'extra-imports': ['a1_contracts', 'bisect', 'collections'],
         'max-line-length': 100
     })
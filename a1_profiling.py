@@ -0,0 +1,113 @@
+"""CSC148 Assignment 1 - Stage profiling
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains StageHook, the interface for code that wants to be told
+when each stage of a simulation round starts and ends, and StageTimer, a hook
+that times each stage.
+
+Register a hook with Simulation.add_stage_hook. While no hooks are registered,
+a simulation runs its rounds exactly as before, so hooks cost nothing unless
+they are used. Simulation.run_profiled runs a simulation with a StageTimer and
+returns its timing breakdown along with the usual statistics.
+"""
+import time
+
+from a1_contracts import check_contracts
+
+# The stages of a simulation round, in order, named after the Simulation
+# methods that run them
+STAGES = ('handle_disembarking', 'generate_arrivals', 'handle_boarding',
+          'move_elevators', 'update_wait_times')
+
+
+class StageHook:
+    """Code that is called before and after each stage of each simulation round.
+
+    Subclasses override the methods they need; by default they do nothing.
+    In event-driven mode, quiet rounds that are skipped over have no stages, so
+    hooks are not called for them.
+    """
+    def before_stage(self, stage: str, round_num: int) -> None:
+        """Called just before the given stage of the given round runs.
+
+        Preconditions:
+        - stage in STAGES
+        """
+
+    def after_stage(self, stage: str, round_num: int) -> None:
+        """Called just after the given stage of the given round has run.
+
+        Preconditions:
+        - stage in STAGES
+        """
+
+
+@check_contracts
+class StageTimer(StageHook):
+    """A stage hook that records how long each stage takes.
+
+    Instance Attributes:
+    - total_times: the total time, in seconds, spent in each stage so far
+    - max_times: the longest time, in seconds, spent in each stage in a single round
+    - num_rounds: the number of rounds timed so far
+
+    Representation Invariants:
+    - set(self.total_times) == set(self.max_times) == set(STAGES)
+    - self.num_rounds >= 0
+
+    >>> timer = StageTimer()
+    >>> for stage in STAGES:
+    ...     timer.before_stage(stage, 0)
+    ...     timer.after_stage(stage, 0)
+    >>> breakdown = timer.breakdown()
+    >>> breakdown['num_rounds'], sorted(breakdown['handle_boarding'])
+    (1, ['max_time', 'mean_time', 'total_time'])
+    """
+    total_times: dict[str, float]
+    max_times: dict[str, float]
+    num_rounds: int
+
+    def __init__(self) -> None:
+        """Initialize a new timer, with no time recorded."""
+        self.total_times = {stage: 0.0 for stage in STAGES}
+        self.max_times = {stage: 0.0 for stage in STAGES}
+        self.num_rounds = 0
+        self._start_time = 0
+
+    def before_stage(self, stage: str, round_num: int) -> None:
+        """Start timing the given stage."""
+        self._start_time = time.perf_counter_ns()
+
+    def after_stage(self, stage: str, round_num: int) -> None:
+        """Record the time taken by the given stage.
+
+        The round is counted once its last stage has run.
+        """
+        elapsed = (time.perf_counter_ns() - self._start_time) / 1e9
+        self.total_times[stage] += elapsed
+        if elapsed > self.max_times[stage]:
+            self.max_times[stage] = elapsed
+        if stage == STAGES[-1]:
+            self.num_rounds += 1
+
+    def breakdown(self) -> dict[str, object]:
+        """Return the number of rounds timed, and for each stage: the total time,
+        the mean time per round, and the longest time in a single round, in seconds.
+        """
+        breakdown = {'num_rounds': self.num_rounds}
+        for stage in STAGES:
+            breakdown[stage] = {
+                'total_time': self.total_times[stage],
+                'mean_time': self.total_times[stage] / max(self.num_rounds, 1),
+                'max_time': self.max_times[stage]
+            }
+        return breakdown
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -12,10 +12,37 @@ Add your own to practice writing tests and to be confident your code is correct.
 
 Note: this file is for support purposes only, and is not part of your submission.
 """
+import copy
+import json
+import os
+import pickle
+import random
+
+import pytest
+
+from a1_contracts import CONTRACTS_ENABLED
 from a1_entities import Person, Elevator
-from a1_algorithms import SingleArrivals, FileArrivals, EndToEndLoop, FurthestFloor
-from a1_simulation import Simulation
+from a1_algorithms import (ArrivalGenerator, SingleArrivals, UniformArrivals, FileArrivals,
+                           StreamingFileArrivals, MovingAlgorithm, BuildingSnapshot,
+                           EndToEndLoop, FurthestFloor)
+from a1_simulation import Simulation, load_checkpoint
+from a1_vectorized import VectorizedSimulation
+from a1_traces import TraceArrivals, convert_csv
+from a1_traffic import PoissonArrivals
+from a1_profiling import STAGES, StageHook
+from a1_dispatch import CollectiveLook, NearestCar
+from a1_sweep import (MOVING_ALGORITHMS, expand_grid, replicate, run_branches, run_spec,
+                      run_sweep, run_tournament)
+from a1_benchmarks import (ENGINE_SPEEDUP, NEAREST_CAR_BUDGET, bench_engines, bench_nearest_car,
+                           compare_results, run_suite)
 
+# Whether to run the tests that compare wall-clock times with the budgets in
+# a1_benchmarks. Timings depend on the machine and how busy it is, so these tests
+# only run when the A1_TIMING_TESTS environment variable is set to 1:
+#
+#     A1_TIMING_TESTS=1 python -m pytest a1_sample_test.py
+TIMING_TESTS = os.environ.get('A1_TIMING_TESTS', '0').strip().lower() \
+    not in ('', '0', 'false', 'no', 'off')
 
 ###############################################################################
 # Sample tests for Parts 1 and 2
@@ -149,6 +176,979 @@ def test_furthest_floor_simple() -> None:
     assert elevator.target_floor == 5
 
 
+###############################################################################
+# Headless entities
+###############################################################################
+def test_headless_simulation_has_no_sprites() -> None:
+    """Test that people and elevators in a headless simulation never get sprites."""
+    config = get_example_config()
+    simulation = Simulation(config)
+    simulation.run(5)
+
+    for elevator in simulation.elevators:
+        assert not hasattr(elevator, 'image')
+        for person in elevator.passengers:
+            assert not hasattr(person, 'image')
+    for people in simulation.waiting.values():
+        for person in people:
+            assert not hasattr(person, 'image')
+
+
+def test_person_sprites_share_cached_images(tmp_path, monkeypatch) -> None:
+    """Test that person sprites with the same anger level share one cached image,
+    and that refresh_image only swaps the image when the anger level changes.
+    """
+    import pygame
+    import a1_sprites
+
+    figures = []
+    for i in range(5):
+        path = str(tmp_path / f'person{i}.png')
+        pygame.image.save(pygame.Surface((4, 4)), path)
+        figures.append(path)
+    monkeypatch.setattr(a1_sprites, 'FIGURES', figures)
+    monkeypatch.setattr(a1_sprites, '_PERSON_IMAGES', {})
+
+    person1, person2 = Person(1, 2), Person(1, 3)
+    sprite1 = a1_sprites.PersonSprite(person1)
+    sprite2 = a1_sprites.PersonSprite(person2)
+    assert sprite1.image is sprite2.image
+
+    person1.wait_time = 1
+    sprite1.refresh_image()
+    assert sprite1.image is sprite2.image
+
+    person1.wait_time = 9
+    sprite1.refresh_image()
+    assert sprite1.anger_level == 4
+    assert sprite1.image is not sprite2.image
+
+
+def test_headless_import_does_not_load_pygame() -> None:
+    """Test that importing the simulation does not import Pygame.
+
+    This is checked in a fresh process, since pytest may already have imported Pygame.
+    """
+    import os
+    import subprocess
+    import sys
+
+    code = 'import sys, a1_simulation; sys.exit("pygame" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code],
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.returncode == 0
+
+
+def test_compact_people_copy_and_pickle() -> None:
+    """Test that people keep their wait times when copied and pickled, and that
+    their compact layout uses less memory than an instance dictionary.
+    """
+    import copy
+    from a1_benchmarks import bench_person_memory
+    from a1_entities import RoundClock
+
+    clock = RoundClock()
+    person = Person(2, 5)
+    person.start_waiting(clock)
+    clock.round_num += 3
+    assert copy.copy(person).wait_time == 3
+    assert pickle.loads(pickle.dumps(person)).wait_time == 3
+
+    sizes = bench_person_memory(2000)
+    assert sizes['arrays'] < sizes['dict']
+    if not CONTRACTS_ENABLED:
+        assert sizes['slots'] < sizes['dict']
+
+
+###############################################################################
+# Contract checking switch
+###############################################################################
+def test_contracts_only_checked_when_enabled() -> None:
+    """Test that python_ta contracts are only installed when A1_CHECK_CONTRACTS is set.
+
+    Contracts are installed at import time, so each setting is checked in a fresh process.
+    """
+    import os
+    import subprocess
+    import sys
+
+    # Person(1, 1) breaks the representation invariant self.start != self.target
+    code = 'from a1_entities import Person; Person(1, 1)'
+    results = {}
+    for setting in ('0', '1'):
+        env = dict(os.environ, A1_CHECK_CONTRACTS=setting)
+        results[setting] = subprocess.run([sys.executable, '-c', code],
+                                          cwd=os.path.dirname(os.path.abspath(__file__)),
+                                          env=env, capture_output=True).returncode
+
+    assert results['0'] == 0
+    assert results['1'] != 0
+
+
+###############################################################################
+# Vectorized simulation
+###############################################################################
+def test_vectorized_matches_simulation_end_to_end_loop() -> None:
+    """Test that VectorizedSimulation gives the same stats as Simulation for EndToEndLoop."""
+    for seed in range(5):
+        config = get_random_config(seed, EndToEndLoop)
+        expected = Simulation(config).run(60)
+
+        config = get_random_config(seed, EndToEndLoop)
+        assert VectorizedSimulation(config).run(60) == expected
+
+
+def test_vectorized_matches_simulation_furthest_floor() -> None:
+    """Test that VectorizedSimulation gives the same stats as Simulation for FurthestFloor."""
+    for seed in range(5):
+        config = get_random_config(seed, FurthestFloor)
+        expected = Simulation(config).run(60)
+
+        config = get_random_config(seed, FurthestFloor)
+        assert VectorizedSimulation(config).run(60) == expected
+
+
+def test_vectorized_continues_across_runs() -> None:
+    """Test that each call to VectorizedSimulation.run continues from the last round
+    run, as Simulation.run does.
+    """
+    for seed in range(5):
+        simulation = Simulation(get_random_config(seed, FurthestFloor))
+        vectorized = VectorizedSimulation(get_random_config(seed, FurthestFloor))
+        for num_rounds in (25, 1, 34):
+            assert vectorized.run(num_rounds) == simulation.run(num_rounds)
+
+
+def test_vectorized_matches_simulation_single_arrivals() -> None:
+    """Test that VectorizedSimulation gives the same stats as Simulation on the example config."""
+    expected = Simulation(get_example_config()).run(15)
+    assert VectorizedSimulation(get_example_config()).run(15) == expected
+
+
+def test_vectorized_matches_simulation_large_building() -> None:
+    """Test that VectorizedSimulation gives the same stats as Simulation on a 200-floor,
+    50-elevator building with 100 arrivals per round.
+    """
+    for moving_algorithm in (EndToEndLoop, FurthestFloor):
+        all_stats = []
+        for engine in (Simulation, VectorizedSimulation):
+            config = {
+                'num_floors': 200,
+                'num_elevators': 50,
+                'elevator_capacity': 20,
+                'arrival_generator': PoissonArrivals(200, 100.0, seed=0),
+                'moving_algorithm': moving_algorithm(),
+                'visualize': False
+            }
+            all_stats.append(engine(config).run(50))
+
+        assert all_stats[0] == all_stats[1]
+
+
+@pytest.mark.skipif(not TIMING_TESTS, reason='timing tests run only when A1_TIMING_TESTS=1')
+@pytest.mark.skipif(CONTRACTS_ENABLED, reason='contract checking slows the engines unevenly')
+def test_vectorized_is_faster_on_large_buildings() -> None:
+    """Test that VectorizedSimulation is at least ENGINE_SPEEDUP times as fast as
+    Simulation on a 200-floor, 50-elevator building with 100 arrivals per round.
+    """
+    for rates in bench_engines(200, 50, 100.0, 500, repeats=3).values():
+        assert rates['VectorizedSimulation'] >= ENGINE_SPEEDUP * rates['Simulation']
+
+
+###############################################################################
+# Event-driven simulation
+###############################################################################
+def test_event_driven_matches_round_by_round(tmp_path) -> None:
+    """Test that event-driven runs give the same stats as round-by-round runs, on
+    sparse arrivals where most rounds are quiet.
+    """
+    path = str(tmp_path / 'sparse_arrivals.csv')
+    with open(path, 'w') as csvfile:
+        csvfile.write('0,1,8\n3,5,2,9,1\n40,1,9\n41,2,3\n90,8,1,4,6\n')
+
+    for moving_algorithm in (EndToEndLoop, FurthestFloor):
+        all_stats = []
+        for event_driven in (False, True):
+            config = {
+                'num_floors': 9,
+                'num_elevators': 2,
+                'elevator_capacity': 1,
+                'arrival_generator': FileArrivals(9, path),
+                'moving_algorithm': moving_algorithm(),
+                'visualize': False,
+                'event_driven': event_driven,
+            }
+            all_stats.append(Simulation(config).run(150))
+
+        assert all_stats[0] == all_stats[1]
+        assert all_stats[1]['people_completed'] > 0
+
+
+def test_event_driven_skips_quiet_rounds(tmp_path) -> None:
+    """Test that an event-driven run does not run every round in full."""
+    path = str(tmp_path / 'sparse_arrivals.csv')
+    with open(path, 'w') as csvfile:
+        csvfile.write('0,1,5\n100,5,1\n')
+
+    config = {
+        'num_floors': 5,
+        'num_elevators': 1,
+        'elevator_capacity': 1,
+        'arrival_generator': FileArrivals(5, path),
+        'moving_algorithm': FurthestFloor(),
+        'visualize': False,
+        'event_driven': True,
+    }
+    simulation = Simulation(config)
+    rounds_run = []
+    handle_boarding = simulation.handle_boarding
+
+    def spy_boarding() -> None:
+        rounds_run.append(simulation.num_rounds)
+        handle_boarding()
+
+    simulation.handle_boarding = spy_boarding
+    stats = simulation.run(200)
+
+    assert stats['num_rounds'] == 200
+    assert len(rounds_run) < 20
+
+
+###############################################################################
+# Lazy wait times
+###############################################################################
+def test_wait_times_derived_from_arrival_round() -> None:
+    """Test that wait times count the rounds since each person arrived, and stop
+    counting once they reach their target floor.
+    """
+    config = get_example_config()
+    simulation = Simulation(config)
+    simulation.run(10)
+
+    # SingleArrivals adds exactly one person to floor 1 in every round
+    waiting = list(simulation.waiting[1])
+    riding = [person for elevator in simulation.elevators for person in elevator.passengers]
+    for person in waiting + riding:
+        assert 1 <= person.wait_time <= 10
+
+    # A person who reaches their target floor stops waiting
+    done = waiting.pop()
+    done.stop_waiting()
+    completed_time = done.wait_time
+    waiting_times = [person.wait_time for person in waiting]
+    simulation.update_wait_times()
+
+    assert done.wait_time == completed_time
+    assert [person.wait_time for person in waiting] == [t + 1 for t in waiting_times]
+
+
+###############################################################################
+# Waiting queues
+###############################################################################
+def test_boarding_takes_people_in_arrival_order() -> None:
+    """Test that boarding takes people from the front of a long waiting queue, in order."""
+    config = get_example_config()
+    config['elevator_capacity'] = 3
+    simulation = Simulation(config)
+    people = [Person(1, 2 + i % 5) for i in range(1000)]
+    simulation.waiting[1].extend(people)
+
+    simulation.handle_boarding()
+
+    assert simulation.elevators[0].passengers == people[:3]
+    assert simulation.elevators[1].passengers == people[3:6]
+    assert simulation.waiting[1] == people[6:]
+    assert simulation.waiting[1][0] is people[6]
+    assert len(simulation.waiting[1]) == 994
+
+
+def test_boarding_from_assigned_list() -> None:
+    """Test that a list of people assigned to a floor of the waiting dictionary is
+    copied into a waiting queue, which boarding takes people from in order.
+    """
+    simulation = Simulation(get_example_config())
+    people = [Person(1, 3), Person(1, 4), Person(1, 5)]
+    simulation.waiting[1] = people
+
+    simulation.handle_boarding()
+
+    assert simulation.elevators[0].passengers == people[:2]
+    assert simulation.elevators[1].passengers == people[2:]
+    assert simulation.waiting[1] == []
+    assert len(people) == 3  # The assigned list is copied, not emptied
+
+
+###############################################################################
+# Elevator passenger index
+###############################################################################
+def test_disembark_only_removes_passengers_for_current_floor() -> None:
+    """Test that Elevator.disembark removes exactly the passengers for its current floor,
+    including passengers added to elevator.passengers directly.
+    """
+    elevator = Elevator(5)
+    people = [Person(1, 3), Person(1, 4), Person(1, 3)]
+    for person in people:
+        elevator.board(person)
+    direct = Person(2, 4)
+    elevator.passengers.append(direct)
+
+    elevator.current_floor = 3
+    assert elevator.disembark() == [people[0], people[2]]
+    assert elevator.passengers == [people[1], direct]
+
+    elevator.current_floor = 4
+    assert elevator.disembark() == [people[1], direct]
+    assert elevator.passengers == []
+    assert elevator.disembark() == []
+
+
+def test_boarding_after_moving_elevator_directly() -> None:
+    """Test that an elevator whose current_floor is set directly picks up the people
+    waiting on its new floor, and that snapshots see it there.
+    """
+    simulation = Simulation(get_example_config())
+    person = Person(4, 1)
+    simulation.waiting[4].append(person)
+    simulation.elevators[1].current_floor = 4
+
+    simulation.handle_boarding()
+    assert simulation.elevators[1].passengers == [person]
+    assert simulation.waiting[4] == []
+
+    # SnapshotChecker checks that each elevator in elevators_by_floor is on that floor
+    simulation.elevators[0].current_floor = 3
+    simulation.moving_algorithm = SnapshotChecker()
+    simulation.move_elevators()
+    assert simulation.moving_algorithm.num_snapshots == 1
+
+
+###############################################################################
+# Occupied floor index
+###############################################################################
+def test_waiting_room_tracks_occupied_floors() -> None:
+    """Test that a simulation's waiting room keeps its occupied floors up to date as
+    people arrive and board, and that FurthestFloor chooses the same targets from it
+    as from a plain dictionary.
+    """
+    config = get_random_config(7, FurthestFloor)
+    config['num_floors'] = 12
+    config['arrival_generator'] = RandomArrivals(12, 7)
+    simulation = Simulation(config)
+
+    for round_num in range(40):
+        simulation.handle_disembarking()
+        simulation.generate_arrivals(round_num)
+        simulation.handle_boarding()
+        expected = [floor for floor, people in simulation.waiting.items() if people]
+        assert simulation.waiting.occupied_floors() == expected
+
+        plain = {floor: list(people) for floor, people in simulation.waiting.items()}
+        elevators = [Elevator(1) for _ in simulation.elevators]
+        for twin, elevator in zip(elevators, simulation.elevators):
+            twin.current_floor, twin.target_floor = elevator.current_floor, elevator.target_floor
+        FurthestFloor().update_target_floors(elevators, plain, simulation.num_floors)
+        simulation.move_elevators()
+        assert [e.target_floor for e in elevators] == \
+            [e.target_floor for e in simulation.elevators]
+
+
+def test_waiting_room_tracks_assigned_floors() -> None:
+    """Test that assigning people to a floor of a waiting room updates its occupied
+    floors, which FurthestFloor then uses to find them, and that copies of the room
+    keep the same occupied floors.
+    """
+    simulation = Simulation(get_example_config())
+    simulation.moving_algorithm = FurthestFloor()
+    simulation.waiting[5] = [Person(5, 1)]
+    simulation.waiting[3] = [Person(3, 1), Person(3, 2)]
+    assert simulation.waiting.occupied_floors() == [3, 5]
+
+    simulation.move_elevators()
+    assert [elevator.target_floor for elevator in simulation.elevators] == [5, 5]
+
+    simulation.waiting[5] = []
+    assert simulation.waiting.occupied_floors() == [3]
+    for room in (simulation.waiting.copy(), copy.deepcopy(simulation.waiting),
+                 pickle.loads(pickle.dumps(simulation.waiting))):
+        assert room.occupied_floors() == [3]
+        room[3].clear()
+        assert room.occupied_floors() == []
+    assert simulation.waiting.occupied_floors() == [3]
+
+
+###############################################################################
+# Streaming file arrivals
+###############################################################################
+def test_streaming_file_arrivals_matches_file_arrivals(tmp_path) -> None:
+    """Test that StreamingFileArrivals generates the same arrivals as FileArrivals,
+    while only keeping a window of rounds in memory.
+    """
+    path = str(tmp_path / 'arrivals.csv')
+    with open(path, 'w') as csvfile:
+        csvfile.write('0,1,4,5,3\n0,1,2\n2,3,1\n7,2,5,2,4,1,3\n9,5,1\n')
+
+    file_arrivals = FileArrivals(5, path)
+    streaming = StreamingFileArrivals(5, path, window=2)
+    for round_num in range(12):
+        assert streaming.next_arrival_round(round_num) == \
+            file_arrivals.next_arrival_round(round_num)
+        assert repr(streaming.generate(round_num)) == repr(file_arrivals.generate(round_num))
+        assert all(round_num <= r < round_num + 2 for r in streaming.arrival_data)
+
+    assert len(file_arrivals.generate(7)[2]) == 2
+
+
+def test_streaming_file_arrivals_rejects_unsorted_file(tmp_path) -> None:
+    """Test that StreamingFileArrivals raises a ValueError when rounds go backwards."""
+    path = str(tmp_path / 'unsorted.csv')
+    with open(path, 'w') as csvfile:
+        csvfile.write('3,1,2\n1,2,1\n')
+
+    streaming = StreamingFileArrivals(2, path, window=1)
+    with pytest.raises(ValueError):
+        streaming.generate(3)
+
+
+def test_streaming_file_arrivals_closes_its_file(tmp_path, monkeypatch) -> None:
+    """Test that StreamingFileArrivals closes its file when its first line is bad,
+    at the end of a with statement, and when run by a sweep.
+    """
+    import a1_algorithms
+
+    opened = []
+
+    def recording_open(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(a1_algorithms, 'open', recording_open, raising=False)
+    path = str(tmp_path / 'arrivals.csv')
+    with open(path, 'w') as csvfile:
+        csvfile.write('first,1,2\n')
+    with pytest.raises(ValueError):
+        StreamingFileArrivals(2, path)
+    assert opened[-1].closed
+
+    with open(path, 'w') as csvfile:
+        csvfile.write('0,1,2\n90,2,1\n')
+    with StreamingFileArrivals(2, path) as streaming:
+        streaming.generate(0)
+        assert not opened[-1].closed
+    assert opened[-1].closed
+
+    run_spec({'num_floors': 2, 'num_elevators': 1, 'elevator_capacity': 1,
+              'arrival_generator': {'name': 'StreamingFileArrivals', 'filename': path},
+              'moving_algorithm': 'EndToEndLoop', 'num_rounds': 10})
+    assert opened[-1].closed
+
+
+###############################################################################
+# Binary arrival traces
+###############################################################################
+def test_trace_arrivals_matches_file_arrivals(tmp_path) -> None:
+    """Test that TraceArrivals on a converted CSV file generates the same arrivals as
+    FileArrivals on the original, including for unsorted files and after pickling.
+    """
+    csv_path = str(tmp_path / 'arrivals.csv')
+    trace_path = str(tmp_path / 'arrivals.trace')
+    with open(csv_path, 'w') as csvfile:
+        csvfile.write('7,2,5,2,4\n0,1,4,5,3\n2,3,1\n0,1,2\n')
+
+    assert convert_csv(csv_path, trace_path) == 6
+    file_arrivals = FileArrivals(5, csv_path)
+    trace = TraceArrivals(5, trace_path)
+    for generator in (trace, pickle.loads(pickle.dumps(trace))):
+        for round_num in range(10):
+            assert repr(generator.generate(round_num)) == \
+                repr(file_arrivals.generate(round_num))
+            assert generator.next_arrival_round(round_num) == \
+                file_arrivals.next_arrival_round(round_num)
+        generator.close()
+
+
+###############################################################################
+# Streaming statistics
+###############################################################################
+def test_wait_stats_match_completed_people() -> None:
+    """Test that a simulation's streaming wait time statistics match the statistics
+    of the people who actually reached their target floors.
+    """
+    config = get_random_config(3, EndToEndLoop)
+    simulation = Simulation(config)
+    completed = []
+    for elevator in simulation.elevators:
+        disembark = elevator.disembark
+
+        def spy_disembark(disembark=disembark) -> list[Person]:
+            people = disembark()
+            completed.extend(people)
+            return people
+
+        elevator.disembark = spy_disembark
+    stats = simulation.run(300)
+
+    wait_times = sorted(person.wait_time for person in completed)
+    assert stats['people_completed'] == len(wait_times) > 0
+    assert stats['max_time'] == wait_times[-1]
+    assert stats['avg_time'] == sum(wait_times) // len(wait_times)
+    for percent in (50, 90, 99):
+        assert simulation.wait_stats.percentile(percent) == \
+            wait_times[-(-len(wait_times) * percent // 100) - 1]
+
+    breakdown = simulation.wait_stats.floor_breakdown()
+    for floor_num, floor_stats in breakdown.items():
+        floor_times = [person.wait_time for person in completed if person.start == floor_num]
+        assert floor_stats == {'people_completed': len(floor_times), 'max_time': max(floor_times),
+                               'avg_time': sum(floor_times) // len(floor_times)}
+    assert sum(s['people_completed'] for s in breakdown.values()) == len(wait_times)
+
+
+###############################################################################
+# Parameter sweeps
+###############################################################################
+def test_sweep_is_reproducible(tmp_path) -> None:
+    """Test that a parallel sweep streams one result per spec to its results file,
+    and gives the same stats as running each spec on its own.
+    """
+    specs = expand_grid({
+        'num_floors': 8,
+        'num_elevators': [1, 3],
+        'elevator_capacity': 4,
+        'arrival_generator': {'name': 'UniformArrivals', 'people_per_round': 2},
+        'moving_algorithm': ['EndToEndLoop', 'FurthestFloor'],
+        'num_rounds': 50,
+    })
+    path = str(tmp_path / 'results.jsonl')
+    results = run_sweep(specs, path, max_workers=2, base_seed=10)
+
+    with open(path) as results_file:
+        streamed = {line['index']: line for line in map(json.loads, results_file)}
+    assert sorted(streamed) == [0, 1, 2, 3]
+    for result in results:
+        assert result['spec']['seed'] == 10 + result['index']
+        assert result['stats'] == run_spec(result['spec'])
+        assert result['stats'] == streamed[result['index']]['stats']
+
+
+def test_uniform_arrivals_seeds_are_independent() -> None:
+    """Test that UniformArrivals generators with consecutive seeds, as used by sweeps
+    and replications, do not generate the same arrivals in different rounds.
+    """
+    first = UniformArrivals(50, 5, seed=0)
+    second = UniformArrivals(50, 5, seed=1)
+    assert repr(first.generate(100003)) != repr(second.generate(0))
+    assert repr(first.generate(7)) == repr(UniformArrivals(50, 5, seed=0).generate(7))
+
+
+def test_replicate_stops_at_target_width() -> None:
+    """Test that replicate summarizes independently seeded runs, and stops once the
+    target interval width is reached.
+    """
+    spec = {'num_floors': 6, 'num_elevators': 2, 'elevator_capacity': 3,
+            'arrival_generator': {'name': 'UniformArrivals', 'people_per_round': 1},
+            'moving_algorithm': 'EndToEndLoop', 'num_rounds': 40}
+
+    full = replicate(spec, max_replications=6, max_workers=2, base_seed=5)
+    assert full['replications'] == 6
+    avg_times = [run_spec(dict(spec, seed=5 + i))['avg_time'] for i in range(6)]
+    summary = full['stats']['avg_time']
+    assert summary['mean'] == sum(avg_times) / 6
+    assert summary['low'] <= summary['mean'] <= summary['high']
+
+    early = replicate(spec, max_replications=6, target_widths={'avg_time': 1000},
+                      max_workers=2, batch_size=2, base_seed=5)
+    assert early['replications'] == 2
+
+
+def test_tournament_shares_arrivals(tmp_path) -> None:
+    """Test that a tournament runs every moving algorithm on the arrivals of its spec,
+    recorded once to a trace, and ranks them.
+    """
+    spec = {'num_floors': 8, 'num_elevators': 2, 'elevator_capacity': 3,
+            'arrival_generator': {'name': 'PoissonArrivals', 'rate': 0.5},
+            'num_rounds': 200, 'seed': 3}
+    path = str(tmp_path / 'arrivals.trace')
+    results = run_tournament(spec, max_workers=2, trace_filename=path)
+
+    assert [result['rank'] for result in results] == list(range(1, len(MOVING_ALGORITHMS) + 1))
+    assert sorted(result['name'] for result in results) == sorted(MOVING_ALGORITHMS)
+    # FurthestFloor delivers nobody here, so its avg_time of -1 does not rank it first
+    assert results[-1]['name'] == 'FurthestFloor'
+    avg_times = [result['stats']['avg_time'] for result in results[:-1]]
+    assert avg_times == sorted(avg_times)
+    for result in results:
+        assert result['stats'] == run_spec(dict(spec, moving_algorithm=result['name']))
+
+    traced = dict(spec, arrival_generator={'name': 'TraceArrivals', 'filename': path})
+    assert run_tournament(traced, max_workers=2)[0]['stats'] == results[0]['stats']
+
+
+###############################################################################
+# Synthetic traffic
+###############################################################################
+def test_poisson_arrivals_are_reproducible() -> None:
+    """Test that PoissonArrivals gives the same arrivals for the same seed and round,
+    whatever order rounds are generated in, and follows its profile.
+    """
+    generator = PoissonArrivals(8, 4.0, 'daily', rounds_per_day=100, seed=3)
+    forwards = [repr(generator.generate(round_num)) for round_num in range(100)]
+    backwards = [repr(generator.generate(round_num)) for round_num in reversed(range(100))]
+    assert forwards == backwards[::-1]
+    assert forwards != [repr(PoissonArrivals(8, 4.0, 'daily', rounds_per_day=100, seed=4)
+                             .generate(round_num)) for round_num in range(100)]
+
+    # Rounds 30 to 39 are the morning up-peak: most people start on the lobby
+    starts = [person.start for round_num in range(30, 40)
+              for people in generator.generate(round_num).values() for person in people]
+    assert starts.count(1) > len(starts) // 2
+
+
+def test_vectorized_matches_simulation_poisson_arrivals() -> None:
+    """Test that VectorizedSimulation, which uses PoissonArrivals.generate_arrays,
+    gives the same stats as Simulation.
+    """
+    for moving_algorithm in (EndToEndLoop, FurthestFloor):
+        config = {'num_floors': 12, 'num_elevators': 3, 'elevator_capacity': 4,
+                  'arrival_generator': PoissonArrivals(12, 1.5, 'lunch', seed=9),
+                  'moving_algorithm': moving_algorithm(), 'visualize': False}
+        expected = Simulation(config).run(200)
+        assert VectorizedSimulation(config).run(200) == expected
+
+
+###############################################################################
+# Checkpoints
+###############################################################################
+def test_checkpoint_resumes_where_it_was_saved(tmp_path) -> None:
+    """Test that a simulation saved part way through, then loaded and run for the rest
+    of the rounds, gives the same stats as an uninterrupted run, including when its
+    arrivals are streamed from a file.
+    """
+    csv_path = str(tmp_path / 'arrivals.csv')
+    with open(csv_path, 'w') as csvfile:
+        for round_num in range(0, 120, 4):
+            csvfile.write(f'{round_num},{1 + round_num % 7},{8 - round_num % 7}\n')
+
+    for arrival_generator in (lambda: RandomArrivals(8, 5),
+                              lambda: StreamingFileArrivals(8, csv_path, window=3)):
+        def make_config() -> dict:
+            return {'num_floors': 8, 'num_elevators': 2, 'elevator_capacity': 2,
+                    'arrival_generator': arrival_generator(),
+                    'moving_algorithm': EndToEndLoop(), 'visualize': False}
+
+        expected = Simulation(make_config()).run(150)
+        simulation = Simulation(make_config())
+        simulation.run(61)
+        checkpoint = str(tmp_path / 'checkpoint.gz')
+        simulation.save_checkpoint(checkpoint)
+
+        assert load_checkpoint(checkpoint).run(89) == expected
+        assert simulation.run(89) == expected
+
+
+###############################################################################
+# Forking
+###############################################################################
+def test_fork_matches_switching_algorithm_mid_run() -> None:
+    """Test that a fork with a new moving algorithm gives the same stats as switching
+    algorithms part way through a single run, and that neither the fork nor its
+    parent affects the other.
+    """
+    def make_simulation() -> Simulation:
+        simulation = Simulation(get_random_config(11, EndToEndLoop))
+        simulation.run(60)
+        return simulation
+
+    switched = make_simulation()
+    switched.moving_algorithm = FurthestFloor()
+    expected_branch = switched.run(80)
+    expected_parent = make_simulation().run(80)
+
+    parent = make_simulation()
+    branch = parent.fork(moving_algorithm=FurthestFloor())
+    assert parent.run(80) == expected_parent
+    assert branch.run(80) == expected_branch
+
+    parent = make_simulation()
+    assert run_branches(parent, [{}, {'moving_algorithm': FurthestFloor()}], 80,
+                        max_workers=2) == [expected_parent, expected_branch]
+    assert parent.num_rounds == 60
+
+
+def test_fork_keeps_wait_times_growing() -> None:
+    """Test that people shared by a fork keep counting their wait times in both
+    simulations, so a fork running an algorithm that reads wait times (NearestCar)
+    changes neither its parent's results nor its own.
+    """
+    def make_simulation() -> Simulation:
+        simulation = Simulation({'num_floors': 20, 'num_elevators': 4, 'elevator_capacity': 4,
+                                 'arrival_generator': PoissonArrivals(20, 0.5, seed=13),
+                                 'moving_algorithm': NearestCar(), 'visualize': False})
+        simulation.run(100)
+        return simulation
+
+    expected = make_simulation().run(200)
+
+    parent = make_simulation()
+    branch = parent.fork()
+    assert parent.run(200) == expected
+    assert branch.run(200) == expected
+
+    parent = make_simulation()
+    branch = parent.fork()
+    branch.run(120)
+    parent.run(50)
+    assert branch.run(80) == parent.run(150) == expected
+
+
+def test_repeated_forks_share_clocks() -> None:
+    """Test that forking one simulation many times without running it does not add a
+    shared clock per fork, and that the forks still give the same stats.
+    """
+    parent = Simulation(get_random_config(11, EndToEndLoop))
+    parent.run(60)
+    branches = [parent.fork() for _ in range(50)]
+    assert len(parent._shared_clocks) == len(branches[-1]._shared_clocks) == 1
+
+    expected = parent.run(40)
+    assert all(branch.run(40) == expected for branch in branches)
+
+    parent.fork()
+    assert len(parent._shared_clocks) == 2
+
+
+###############################################################################
+# Stage profiling
+###############################################################################
+class RecordingHook(StageHook):
+    """A stage hook that records every call made to it."""
+    def __init__(self) -> None:
+        self.calls = []
+
+    def before_stage(self, stage: str, round_num: int) -> None:
+        self.calls.append(('before', stage, round_num))
+
+    def after_stage(self, stage: str, round_num: int) -> None:
+        self.calls.append(('after', stage, round_num))
+
+
+def test_stage_hooks_and_profiled_run() -> None:
+    """Test that stage hooks are called around every stage in order, and that a
+    profiled run gives the same stats as a normal run along with a breakdown.
+    """
+    simulation = Simulation(get_example_config())
+    hook = RecordingHook()
+    simulation.add_stage_hook(hook)
+    simulation.run(2)
+    assert hook.calls == [(when, stage, round_num) for round_num in range(2)
+                          for stage in STAGES for when in ('before', 'after')]
+
+    simulation.remove_stage_hook(hook)
+    simulation.run(1)
+    assert len(hook.calls) == 20
+
+    stats, breakdown = Simulation(get_example_config()).run_profiled(15)
+    assert stats == Simulation(get_example_config()).run(15)
+    assert breakdown['num_rounds'] == 15
+    for stage in STAGES:
+        assert 0 <= breakdown[stage]['max_time'] <= breakdown[stage]['total_time']
+
+
+def test_stage_hooks_keep_round_pauses(monkeypatch) -> None:
+    """Test that rounds run with stage hooks still pause between rounds."""
+    simulation = Simulation(get_example_config())
+    pauses = []
+    monkeypatch.setattr(simulation.visualizer, 'wait', pauses.append)
+    simulation.add_stage_hook(RecordingHook())
+    simulation.run(3)
+    assert pauses == [1, 1, 1]
+
+
+###############################################################################
+# Building snapshots
+###############################################################################
+class SnapshotChecker(FurthestFloor):
+    """FurthestFloor, checking each snapshot it is given against the building."""
+    def __init__(self) -> None:
+        self.num_snapshots = 0
+
+    def update_from_snapshot(self, snapshot: BuildingSnapshot) -> None:
+        self.num_snapshots += 1
+        waiting = snapshot.waiting
+        assert snapshot.waiting_counts[1:] == [len(waiting[floor]) for floor in waiting]
+        assert snapshot.occupied_floors == [floor for floor in waiting if waiting[floor]]
+        assert snapshot.elevator_loads == [len(e.passengers) for e in snapshot.elevators]
+        for elevator, targets in zip(snapshot.elevators, snapshot.passenger_targets):
+            assert targets == sum(1 << floor for floor in {p.target for p in elevator.passengers})
+        for floor, elevators in snapshot.elevators_by_floor.items():
+            assert all(elevator.current_floor == floor for elevator in elevators)
+        FurthestFloor.update_from_snapshot(self, snapshot)
+
+
+def test_building_snapshots() -> None:
+    """Test that algorithms that use snapshots get an accurate snapshot each round and
+    behave the same as when called directly, and that other algorithms are still
+    called through update_target_floors.
+    """
+    config = get_random_config(3, SnapshotChecker)
+    checked = Simulation(config).run(40)
+    assert config['moving_algorithm'].num_snapshots == 40
+    assert checked == Simulation(get_random_config(3, FurthestFloor)).run(40)
+
+    class DirectFurthestFloor(MovingAlgorithm):
+        """FurthestFloor, without snapshots."""
+        def update_target_floors(self, elevators, waiting, max_floor) -> None:
+            FurthestFloor().update_target_floors(elevators, waiting, max_floor)
+
+    assert Simulation(get_random_config(3, DirectFurthestFloor)).run(40) == checked
+
+
+###############################################################################
+# Nearest car dispatch
+###############################################################################
+def test_nearest_car_delivers_everyone(tmp_path) -> None:
+    """Test that NearestCar takes everyone to their target floor, and that event-driven
+    runs with it give the same stats as round-by-round runs.
+    """
+    path = str(tmp_path / 'sparse_arrivals.csv')
+    with open(path, 'w') as csvfile:
+        csvfile.write('0,1,8\n3,5,2,9,1\n40,1,9\n41,2,3\n90,8,1,4,6\n')
+
+    all_stats = []
+    for event_driven in (False, True):
+        config = {
+            'num_floors': 9,
+            'num_elevators': 2,
+            'elevator_capacity': 1,
+            'arrival_generator': FileArrivals(9, path),
+            'moving_algorithm': NearestCar(),
+            'visualize': False,
+            'event_driven': event_driven,
+        }
+        all_stats.append(Simulation(config).run(150))
+
+    assert all_stats[0] == all_stats[1]
+    assert all_stats[0]['people_completed'] == all_stats[0]['total_people'] == 7
+
+
+def test_nearest_car_splits_calls_between_elevators() -> None:
+    """Test that a hall call gets as many empty elevators as it needs, and that other
+    elevators go to the other hall calls.
+    """
+    elevators = [Elevator(2) for _ in range(4)]
+    for elevator, floor in zip(elevators, (1, 2, 9, 10)):
+        elevator.current_floor = floor
+    waiting = {floor: [] for floor in range(1, 11)}
+    waiting[3].extend(Person(3, 1) for _ in range(3))
+    waiting[10].append(Person(10, 1))
+
+    NearestCar().update_target_floors(elevators, waiting, 10)
+    assert [elevator.target_floor for elevator in elevators] == [3, 3, 9, 10]
+
+
+@pytest.mark.skipif(not TIMING_TESTS, reason='timing tests run only when A1_TIMING_TESTS=1')
+@pytest.mark.skipif(CONTRACTS_ENABLED, reason='contract checking is not timed')
+def test_nearest_car_stays_within_budget() -> None:
+    """Test that NearestCar updates the target floors of 64 elevators in a 300-floor
+    building within NEAREST_CAR_BUDGET, on average and in 99% of rounds.
+    """
+    times = bench_nearest_car(300, 64, 5.0, 500)
+    assert times['mean_time'] <= NEAREST_CAR_BUDGET
+    assert times['p99_time'] <= NEAREST_CAR_BUDGET
+
+
+def test_nearest_car_ignores_full_elevators() -> None:
+    """Test that a hall call goes to the nearest elevator with room, passing over a
+    nearer elevator that is already full.
+    """
+    elevators = [Elevator(1), Elevator(1)]
+    elevators[0].current_floor = 4
+    elevators[0].board(Person(1, 6))
+    waiting = {floor: [] for floor in range(1, 11)}
+    waiting[5].append(Person(5, 1))
+
+    NearestCar().update_target_floors(elevators, waiting, 10)
+    assert [elevator.target_floor for elevator in elevators] == [6, 5]
+
+
+###############################################################################
+# Collective LOOK
+###############################################################################
+def test_collective_look_delivers_everyone(tmp_path) -> None:
+    """Test that CollectiveLook takes everyone to their target floor, and that
+    event-driven runs with it give the same stats as round-by-round runs.
+    """
+    path = str(tmp_path / 'sparse_arrivals.csv')
+    with open(path, 'w') as csvfile:
+        csvfile.write('0,1,8\n3,5,2,9,1\n40,1,9\n41,2,3\n90,8,1,4,6\n')
+
+    all_stats = []
+    for event_driven in (False, True):
+        config = {
+            'num_floors': 9,
+            'num_elevators': 2,
+            'elevator_capacity': 1,
+            'arrival_generator': FileArrivals(9, path),
+            'moving_algorithm': CollectiveLook(),
+            'visualize': False,
+            'event_driven': event_driven,
+        }
+        all_stats.append(Simulation(config).run(150))
+
+    assert all_stats[0] == all_stats[1]
+    assert all_stats[0]['people_completed'] == all_stats[0]['total_people'] == 7
+
+
+def test_collective_look_keeps_direction() -> None:
+    """Test that an elevator keeps going in its direction while it has stops ahead,
+    passing closer stops behind it, and turns around at its last stop.
+    """
+    elevator = Elevator(5)
+    elevator.current_floor = 4
+    elevator.board(Person(1, 8))
+    waiting = {floor: [] for floor in range(1, 11)}
+    look = CollectiveLook()
+
+    look.update_target_floors([elevator], waiting, 10)
+    assert elevator.target_floor == 8
+    elevator.current_floor = 5
+    waiting[4].append(Person(4, 1))
+    waiting[6].append(Person(6, 9))
+    look.update_target_floors([elevator], waiting, 10)
+    assert elevator.target_floor == 6
+
+    elevator.current_floor = 8
+    elevator.disembark()
+    look.update_target_floors([elevator], waiting, 10)
+    assert elevator.target_floor == 6
+    waiting[6].clear()
+    look.update_target_floors([elevator], waiting, 10)
+    assert elevator.target_floor == 4
+
+
+###############################################################################
+# Benchmark suite
+###############################################################################
+def test_benchmark_suite_results() -> None:
+    """Test that the benchmark suite measures every part of a scenario, including a
+    recorded trace, gives the same simulation results each time, and that results
+    compared with themselves have no regressions.
+    """
+    results = run_suite(['small', 'rush-hour'], scale=0.01)
+    assert set(results['results']) == {
+        f'{kind}/{scenario}/{algorithm}' for kind in ('run', 'update')
+        for scenario in ('small', 'rush-hour') for algorithm in MOVING_ALGORITHMS
+    } | {'generate/small', 'generate/rush-hour'}
+    run = results['results']['run/rush-hour/EndToEndLoop']
+    assert run['rounds_per_second'] > 0 and run['peak_memory'] > 0
+    assert json.loads(json.dumps(results))['metadata']['scale'] == 0.01
+
+    again = run_suite(['rush-hour'], scale=0.01)
+    assert again['results']['run/rush-hour/EndToEndLoop']['avg_time'] == run['avg_time']
+
+    comparison = compare_results(results, results)
+    assert comparison and not any(row['regression'] for row in comparison)
+
+
 ###############################################################################
 # Helpers
 ###############################################################################
@@ -168,6 +1168,39 @@ def get_example_config() -> dict:
     }
 
 
+class RandomArrivals(ArrivalGenerator):
+    """An arrival generator that adds a few people with random floors each round.
+
+    The arrivals for each round only depend on the seed and the round number, so two
+    generators with the same seed generate the same people.
+    """
+    def __init__(self, max_floor: int, seed: int) -> None:
+        ArrivalGenerator.__init__(self, max_floor)
+        self._seed = seed
+
+    def generate(self, round_num: int) -> dict[int, list[Person]]:
+        rng = random.Random(self._seed * 100003 + round_num)
+        arrivals = {}
+        for _ in range(rng.randint(0, 4)):
+            start, target = rng.sample(range(1, self.max_floor + 1), 2)
+            arrivals.setdefault(start, []).append(Person(start, target))
+        return arrivals
+
+
+def get_random_config(seed: int, moving_algorithm: type) -> dict:
+    """Return a configuration with random arrivals, and a building size chosen using seed."""
+    rng = random.Random(seed)
+    num_floors = rng.randint(2, 12)
+    return {
+        'num_floors': num_floors,
+        'num_elevators': rng.randint(1, 4),
+        'elevator_capacity': rng.randint(1, 4),
+        'arrival_generator': RandomArrivals(num_floors, seed),
+        'moving_algorithm': moving_algorithm(),
+        'visualize': False,
+    }
+
+
 if __name__ == '__main__':
     import pytest
 
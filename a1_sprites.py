@@ -0,0 +1,193 @@
+"""CSC148 Assignment 1 - Sprites
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module Description ===
+
+This file contains the Pygame sprites drawn by the Visualizer in a1_visualizer.py.
+It is only imported the first time a Visualizer is built with visualize=True, so
+headless simulations never import Pygame, initialize it, or look up fonts.
+
+You aren't responsible for any of the code in this file.
+"""
+from __future__ import annotations
+import random
+from typing import Any, TYPE_CHECKING
+
+import pygame
+
+from a1_visualizer import (WHITE, BLACK, BLUE, GREEN, DARK_GREEN, WIDTH,
+                           FLOOR_BORDER_HEIGHT, ELEVATOR_HEIGHT, ELEVATOR_WIDTH,
+                           PERSON_HEIGHT, PERSON_WIDTH, FIGURES, FONT_HEIGHT)
+
+if TYPE_CHECKING:
+    from a1_entities import Person, Elevator
+
+# Pre-scaled person images, keyed by (anger level, width, height) and shared by
+# every PersonSprite in this process. See _get_person_image.
+_PERSON_IMAGES: dict[tuple[int, int, int], pygame.Surface] = {}
+
+# Fonts, keyed by height. See get_font.
+_FONTS: dict[int, pygame.font.Font] = {}
+
+
+###############################################################################
+# Public sprite classes
+###############################################################################
+class ElevatorSprite(pygame.sprite.Sprite):
+    """Sprite representing an elevator.
+
+    The Visualizer attaches one of these to each elevator it is given. The
+    elevator itself is a plain model that knows nothing about Pygame.
+
+    Instance Attributes:
+    - elevator: the elevator this sprite draws
+    - image: the Pygame surface on which to draw this sprite
+    - rect: the rectangle representing the dimensions of this sprite
+    """
+    elevator: Elevator
+    image: pygame.Surface
+    rect: pygame.Rect
+
+    def __init__(self, elevator: Elevator) -> None:
+        """Initialize a new ElevatorSprite for the given elevator."""
+        super().__init__()
+        self.elevator = elevator
+        self.image = pygame.Surface([ELEVATOR_WIDTH, ELEVATOR_HEIGHT])
+        self.image.fill(GREEN)
+        self.image.set_colorkey(WHITE)
+        self.rect = self.image.get_rect()
+
+    def update(self) -> None:
+        """Update this elevator's image based on its fullness."""
+        pygame.draw.rect(self.image, GREEN,
+                         [0, 0, ELEVATOR_WIDTH, ELEVATOR_HEIGHT])
+        pygame.draw.rect(self.image, DARK_GREEN,
+                         [0, ELEVATOR_HEIGHT * (1 - self.elevator.fullness()),
+                          ELEVATOR_WIDTH, ELEVATOR_HEIGHT])
+
+
+class PersonSprite(pygame.sprite.Sprite):
+    """Sprite representing a person.
+
+    The Visualizer attaches one of these to each person when they arrive.
+    The person itself is a plain model that knows nothing about Pygame.
+
+    Instance Attributes:
+    - person: the person this sprite draws
+    - anger_level: the anger level shown by this sprite's current image
+    - height: the height of the person sprite
+    - width: the width of the person sprite
+    - image: the Pygame surface on which to draw this sprite.
+        This surface is shared with other sprites, and must not be drawn on.
+    - rect: the rectangle representing the dimensions of this sprite
+
+    Representation Invariants:
+    - 0 <= self.anger_level <= 4
+    - self.height >= 0
+    - self.width >= 0
+    """
+    person: Person
+    anger_level: int
+    height: int
+    width: int
+    image: pygame.Surface
+    rect: pygame.Rect
+
+    def __init__(self, person: Person) -> None:
+        """Initialize a new sprite for the given person."""
+        super().__init__()
+        self.person = person
+        self.width, self.height = PERSON_WIDTH, PERSON_HEIGHT
+        self.image = self.load_image()
+        self.rect = self.image.get_rect()
+        self.rect.bottom = 0
+        self.rect.centerx = random.randint(-2, 2)
+
+    def load_image(self) -> Any:
+        """Return the image for this sprite's current anger level.
+        Lower indices are happier :)
+
+        The image comes from a process-wide cache, so it is only read from disk
+        and rescaled the first time any sprite needs it.
+        """
+        self.anger_level = self.person.get_anger_level()
+        return _get_person_image(self.anger_level, self.width, self.height)
+
+    def refresh_image(self) -> None:
+        """Swap this sprite's image if its person's anger level has changed."""
+        if self.person.get_anger_level() != self.anger_level:
+            self.image = self.load_image()
+
+
+###############################################################################
+# Image and font caches
+###############################################################################
+def _get_person_image(anger_level: int, width: int, height: int) -> pygame.Surface:
+    """Return the person image for the given anger level, scaled to the given size.
+
+    Each image is loaded and scaled only once per process; later calls return
+    the same cached surface.
+    """
+    key = (anger_level, width, height)
+    if key not in _PERSON_IMAGES:
+        image = pygame.image.load(FIGURES[anger_level])
+        _PERSON_IMAGES[key] = pygame.transform.scale(image, (width, height))
+    return _PERSON_IMAGES[key]
+
+
+def get_font(height: int) -> pygame.font.Font:
+    """Return the Comic Sans font of the given height.
+
+    Pygame's font module is initialized, and the system fonts are searched,
+    only the first time a font is needed.
+    """
+    if height not in _FONTS:
+        pygame.font.init()
+        _FONTS[height] = pygame.font.SysFont('Comic Sans MS', height)
+    return _FONTS[height]
+
+
+###############################################################################
+# Building sprite classes
+###############################################################################
+class FloorSprite(pygame.sprite.Sprite):
+    """Sprite that draws a floor of the building.
+    """
+    def __init__(self, width: int, height: int, y: int) -> None:
+        """Initialize a sprite representing a floor of the building."""
+        super().__init__()
+        self.image = pygame.Surface([width, height])
+        self.image.fill(WHITE)
+        self.image.set_colorkey(WHITE)
+        pygame.draw.rect(self.image, BLUE, [0, 0, width, FLOOR_BORDER_HEIGHT])
+        self.rect = self.image.get_rect()
+        self.rect.top = y
+
+
+class FloorNumSprite(pygame.sprite.Sprite):
+    """Text Sprite to Label the floor number.
+    """
+    def __init__(self, floor_y: int, text: str) -> None:
+        """Initialize a floor number text sprite."""
+        super().__init__()
+        self.floor_font = get_font(FONT_HEIGHT)
+        self.image = self.floor_font.render(text, True, BLACK)
+        self.rect = self.image.get_rect()
+        self.rect.bottom = floor_y
+        self.rect.right = WIDTH - 20
+
+
+class StatLineSprite(pygame.sprite.Sprite):
+    """Text Sprite for displaying some text.
+    """
+    def __init__(self, y: int, text: str) -> None:
+        """Initialize a text sprite."""
+        super().__init__()
+        self.floor_font = get_font(FONT_HEIGHT)
+        self.image = self.floor_font.render(text, True, BLACK)
+        self.rect = self.image.get_rect()
+        self.rect.top = y
+        self.rect.left = 5
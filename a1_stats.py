@@ -0,0 +1,188 @@
+"""CSC148 Assignment 1 - Wait time statistics
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains WaitTimeStats, which a Simulation uses to keep statistics
+about the wait times of the people who reach their target floors.
+
+Rather than keeping every person who has finished, WaitTimeStats updates a few
+running totals and a histogram as each one finishes. Its memory use depends
+only on the number of floors, never on how long the simulation runs.
+
+The histogram counts small wait times exactly. Larger wait times are counted in
+buckets that each cover 1/64 of a power of two, so percentiles are within about
+1.6% of the true value, and the histogram never has more than a few thousand
+buckets.
+"""
+from a1_contracts import check_contracts
+
+# Wait times below this are counted exactly, one bucket per wait time
+_EXACT_LIMIT = 128
+# Each power of two from _EXACT_LIMIT up is split into this many buckets
+_SUB_BUCKETS = 64
+_SUB_BUCKET_BITS = 6
+
+
+def _bucket_of(wait_time: int) -> int:
+    """Return the index of the histogram bucket that counts the given wait time.
+
+    >>> [_bucket_of(t) for t in (0, 127, 128, 129, 130, 255, 256, 259)]
+    [0, 127, 128, 128, 129, 191, 192, 192]
+    """
+    if wait_time < _EXACT_LIMIT:
+        return wait_time
+    exponent = wait_time.bit_length() - 1
+    shift = exponent - _SUB_BUCKET_BITS
+    sub_bucket = (wait_time >> shift) - _SUB_BUCKETS
+    return _EXACT_LIMIT + (shift - 1) * _SUB_BUCKETS + sub_bucket
+
+
+def _lowest_in_bucket(bucket: int) -> int:
+    """Return the lowest wait time counted by the given histogram bucket.
+
+    >>> [_lowest_in_bucket(b) for b in (0, 127, 128, 129, 191, 192)]
+    [0, 127, 128, 130, 254, 256]
+    """
+    if bucket < _EXACT_LIMIT:
+        return bucket
+    shift, sub_bucket = divmod(bucket - _EXACT_LIMIT, _SUB_BUCKETS)
+    return (_SUB_BUCKETS + sub_bucket) << (shift + 1)
+
+
+@check_contracts
+class WaitTimeStats:
+    """Running statistics about the wait times of people who reached their target floor.
+
+    Instance Attributes:
+    - num_floors: the number of floors in the building
+    - count: the number of people recorded
+    - total: the sum of the wait times of the people recorded
+    - max_time: the longest wait time recorded, or -1 if nobody has been recorded
+
+    Representation Invariants:
+    - self.num_floors >= 1
+    - self.count >= 0
+    - self.total >= 0
+    - self.max_time >= -1
+    - (self.count == 0) == (self.max_time == -1)
+
+    >>> stats = WaitTimeStats(3)
+    >>> for wait_time in range(1, 11):
+    ...     stats.add(wait_time, 1 + wait_time % 3)
+    >>> stats.count, stats.total, stats.max_time, stats.average()
+    (10, 55, 10, 5)
+    >>> stats.percentile(50), stats.percentile(90), stats.percentile(100)
+    (5, 9, 10)
+    >>> stats.floor_breakdown()[1]
+    {'people_completed': 3, 'max_time': 9, 'avg_time': 6}
+    """
+    num_floors: int
+    count: int
+    total: int
+    max_time: int
+
+    def __init__(self, num_floors: int) -> None:
+        """Initialize statistics for a building with the given number of floors, with
+        nobody recorded yet.
+
+        Preconditions:
+        - num_floors >= 1
+        """
+        self.num_floors = num_floors
+        self.count = 0
+        self.total = 0
+        self.max_time = -1
+
+        # _histogram[b] is the number of wait times in bucket b (see _bucket_of).
+        # It only grows as long as the highest bucket used so far.
+        self._histogram = []
+
+        # Totals for each starting floor, indexed by floor number (index 0 is unused)
+        self._floor_counts = [0] * (num_floors + 1)
+        self._floor_totals = [0] * (num_floors + 1)
+        self._floor_max = [-1] * (num_floors + 1)
+
+    def add(self, wait_time: int, start_floor: int) -> None:
+        """Record a person who started on the given floor and waited for the given time.
+
+        Preconditions:
+        - wait_time >= 0
+        - 1 <= start_floor <= self.num_floors
+        """
+        self.count += 1
+        self.total += wait_time
+        if wait_time > self.max_time:
+            self.max_time = wait_time
+
+        bucket = _bucket_of(wait_time)
+        if bucket >= len(self._histogram):
+            self._histogram.extend([0] * (bucket + 1 - len(self._histogram)))
+        self._histogram[bucket] += 1
+
+        self._floor_counts[start_floor] += 1
+        self._floor_totals[start_floor] += wait_time
+        if wait_time > self._floor_max[start_floor]:
+            self._floor_max[start_floor] = wait_time
+
+    def average(self) -> int:
+        """Return the average wait time, rounded down, or -1 if nobody has been recorded."""
+        if self.count == 0:
+            return -1
+        return self.total // self.count
+
+    def percentile(self, percent: int) -> int:
+        """Return the given percentile of the wait times recorded, or -1 if nobody has
+        been recorded.
+
+        This is the smallest wait time that at least the given percentage of people
+        waited no longer than. It is exact for wait times under 128, and otherwise
+        the lowest wait time in that wait time's histogram bucket.
+
+        Preconditions:
+        - 0 <= percent <= 100
+        """
+        if self.count == 0:
+            return -1
+
+        # The rank, counting from 1, of the wait time we want
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for bucket, bucket_count in enumerate(self._histogram):
+            seen += bucket_count
+            if seen >= rank:
+                return min(_lowest_in_bucket(bucket), self.max_time)
+        return self.max_time
+
+    def summary(self) -> dict[str, int]:
+        """Return the average, maximum, and 50th, 90th and 99th percentile wait times."""
+        return {
+            'people_completed': self.count,
+            'max_time': self.max_time,
+            'avg_time': self.average(),
+            'p50_time': self.percentile(50),
+            'p90_time': self.percentile(90),
+            'p99_time': self.percentile(99)
+        }
+
+    def floor_breakdown(self) -> dict[int, dict[str, int]]:
+        """Return the number of people recorded, and their maximum and average wait
+        times, for each starting floor where anyone was recorded.
+        """
+        breakdown = {}
+        for floor_num in range(1, self.num_floors + 1):
+            count = self._floor_counts[floor_num]
+            if count > 0:
+                breakdown[floor_num] = {
+                    'people_completed': count,
+                    'max_time': self._floor_max[floor_num],
+                    'avg_time': self._floor_totals[floor_num] // count
+                }
+        return breakdown
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
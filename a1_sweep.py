@@ -0,0 +1,596 @@
+"""CSC148 Assignment 1 - Parameter sweeps
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module runs many headless simulations in parallel, for comparing elevator
+counts, capacities and algorithms.
+
+Each simulation is described by a *spec*: a dictionary that can be written as
+JSON. It has the same keys as a Simulation configuration, except that:
+- 'arrival_generator' and 'moving_algorithm' are given by name (a key of
+  ARRIVAL_GENERATORS or MOVING_ALGORITHMS), or by a dictionary with a 'name' and
+  any other arguments for the class, e.g.
+  {'name': 'UniformArrivals', 'people_per_round': 3}. An arrival generator is
+  always given the number of floors as its max_floor.
+- 'num_rounds' is the number of rounds to run.
+- 'seed' is the seed used for the run. The random module is seeded with it
+  before the simulation is built, and it is passed to the arrival generator if
+  the generator takes a seed.
+- 'visualize' is not needed: sweeps are always headless.
+Any other keys (such as 'event_driven') are passed on in the configuration.
+
+run_sweep runs a list of specs over a process pool, and writes each result as a
+line of JSON as soon as it finishes. To run a sweep from the command line, give
+a JSON file with a list of specs, or a grid (see expand_grid):
+
+    python a1_sweep.py grid.json results.jsonl --workers 8
+
+replicate runs many independently seeded copies of one spec, and reports the
+mean of each statistic with a confidence interval. To replicate every spec in a
+sweep, stopping each one once its avg_time interval is at most 5 rounds wide:
+
+    python a1_sweep.py grid.json results.jsonl --replications 200 --target-width avg_time=5
+
+run_tournament compares every moving algorithm in MOVING_ALGORITHMS on the same
+arrivals. The arrivals are generated (or loaded) only once, and recorded to a
+trace file that every worker process maps read-only, so the comparison costs
+one pass over the arrivals however many algorithms there are. To run a
+tournament for each spec in a sweep, and print a table of the algorithms
+ranked by their p90 wait time:
+
+    python a1_sweep.py spec.json results.jsonl --tournament --rank-by p90_time
+
+run_branches asks what-if questions about a simulation that has already been
+warmed up: it forks it once per branch (see Simulation.fork), and runs the
+branches in parallel.
+"""
+from __future__ import annotations
+import argparse
+import inspect
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Optional
+
+import a1_algorithms
+from a1_dispatch import CollectiveLook, NearestCar
+from a1_simulation import Simulation
+from a1_traces import TraceArrivals, record_arrivals
+from a1_traffic import PoissonArrivals
+
+# The moving algorithms that specs can name
+MOVING_ALGORITHMS: dict[str, type] = {
+    'EndToEndLoop': a1_algorithms.EndToEndLoop,
+    'FurthestFloor': a1_algorithms.FurthestFloor,
+    'NearestCar': NearestCar,
+    'CollectiveLook': CollectiveLook,
+}
+
+# The arrival generators that specs can name
+ARRIVAL_GENERATORS: dict[str, type] = {
+    'SingleArrivals': a1_algorithms.SingleArrivals,
+    'UniformArrivals': a1_algorithms.UniformArrivals,
+    'FileArrivals': a1_algorithms.FileArrivals,
+    'StreamingFileArrivals': a1_algorithms.StreamingFileArrivals,
+    'TraceArrivals': TraceArrivals,
+    'PoissonArrivals': PoissonArrivals,
+}
+
+# The keys of a spec that are not passed on in the simulation configuration
+_SPEC_ONLY_KEYS = ('num_rounds', 'seed')
+
+
+###############################################################################
+# Building simulations from specs
+###############################################################################
+def build_config(spec: dict[str, Any]) -> dict[str, Any]:
+    """Return a headless Simulation configuration for the given spec.
+
+    Raise a ValueError if the spec names an unknown algorithm.
+
+    >>> config = build_config({'num_floors': 5, 'num_elevators': 2, 'elevator_capacity': 3,
+    ...                        'arrival_generator': {'name': 'UniformArrivals',
+    ...                                              'people_per_round': 2},
+    ...                        'moving_algorithm': 'FurthestFloor',
+    ...                        'num_rounds': 10, 'seed': 4})
+    >>> config['arrival_generator'].seed, config['visualize']
+    (4, False)
+    >>> sorted(config)  # doctest: +NORMALIZE_WHITESPACE
+    ['arrival_generator', 'elevator_capacity', 'moving_algorithm', 'num_elevators',
+     'num_floors', 'visualize']
+    """
+    config = {key: value for key, value in spec.items() if key not in _SPEC_ONLY_KEYS}
+    config['arrival_generator'] = build_arrival_generator(spec)
+
+    name, kwargs = _name_and_kwargs(spec['moving_algorithm'])
+    if name not in MOVING_ALGORITHMS:
+        raise ValueError(f'unknown moving algorithm {name!r}')
+    config['moving_algorithm'] = MOVING_ALGORITHMS[name](**kwargs)
+
+    config['visualize'] = False
+    return config
+
+
+def build_arrival_generator(spec: dict[str, Any]) -> a1_algorithms.ArrivalGenerator:
+    """Return the arrival generator for the given spec.
+
+    Raise a ValueError if the spec names an unknown arrival generator.
+    """
+    name, kwargs = _name_and_kwargs(spec['arrival_generator'])
+    if name not in ARRIVAL_GENERATORS:
+        raise ValueError(f'unknown arrival generator {name!r}')
+    generator_class = ARRIVAL_GENERATORS[name]
+    seed = spec.get('seed')
+    if seed is not None and 'seed' in inspect.signature(generator_class).parameters:
+        kwargs.setdefault('seed', seed)
+    return generator_class(spec['num_floors'], **kwargs)
+
+
+def _name_and_kwargs(choice: Any) -> tuple[str, dict[str, Any]]:
+    """Return the class name and constructor arguments for the given algorithm in a spec."""
+    if isinstance(choice, str):
+        return choice, {}
+    kwargs = dict(choice)
+    return kwargs.pop('name'), kwargs
+
+
+def run_spec(spec: dict[str, Any]) -> dict[str, int]:
+    """Run a simulation for the given spec, and return its statistics along with
+    its 50th, 90th and 99th percentile wait times.
+    """
+    if spec.get('seed') is not None:
+        random.seed(spec['seed'])
+    simulation = Simulation(build_config(spec))
+    with simulation.arrival_generator:
+        stats = simulation.run(spec['num_rounds'])
+    summary = simulation.wait_stats.summary()
+    for key in ('p50_time', 'p90_time', 'p99_time'):
+        stats[key] = summary[key]
+    return stats
+
+
+def _run_timed(spec: dict[str, Any]) -> tuple[dict[str, int], float]:
+    """Return the result of run_spec for the given spec, and how long it took in seconds."""
+    start_time = time.perf_counter()
+    stats = run_spec(spec)
+    return stats, time.perf_counter() - start_time
+
+
+###############################################################################
+# Sweeps
+###############################################################################
+def expand_grid(grid: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return a spec for every combination of the values in the given grid.
+
+    Each value in grid that is a list is a set of choices for that key; every
+    other value is used in every spec.
+
+    >>> specs = expand_grid({'num_floors': 10, 'num_elevators': [1, 2],
+    ...                      'moving_algorithm': ['EndToEndLoop', 'FurthestFloor']})
+    >>> [(spec['num_elevators'], spec['moving_algorithm']) for spec in specs]
+    [(1, 'EndToEndLoop'), (1, 'FurthestFloor'), (2, 'EndToEndLoop'), (2, 'FurthestFloor')]
+    """
+    keys = list(grid)
+    choices = [value if isinstance(value, list) else [value] for value in grid.values()]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*choices)]
+
+
+def run_sweep(specs: list[dict[str, Any]], results_filename: str,
+              max_workers: Optional[int] = None, base_seed: int = 0) -> list[dict[str, Any]]:
+    """Run a simulation for each of the given specs in parallel, and return a
+    result for each one, in the same order as specs.
+
+    A spec without a seed gets the seed base_seed + its index in specs, so the
+    same sweep always gives the same results, however many workers run it.
+
+    Each result is a dictionary with the spec's 'index', the 'spec' itself
+    (including its seed), the 'stats' returned by run_spec, and the 'run_time'
+    of the simulation in seconds. Each result is written to the given file as a
+    line of JSON as soon as its simulation finishes, so results appear in the
+    file in the order they finish.
+
+    max_workers is the number of worker processes (by default, one per CPU).
+
+    Preconditions:
+    - Every spec is in the format described at the top of this module
+    """
+    specs = [dict(spec) for spec in specs]
+    for index, spec in enumerate(specs):
+        spec.setdefault('seed', base_seed + index)
+
+    results = [None] * len(specs)
+    with open(results_filename, 'w') as results_file, \
+            ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_run_timed, spec): index for index, spec in enumerate(specs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            stats, run_time = future.result()
+            results[index] = {'index': index, 'spec': specs[index], 'stats': stats,
+                              'run_time': run_time}
+            results_file.write(json.dumps(results[index]) + '\n')
+            results_file.flush()
+    return results
+
+
+###############################################################################
+# Replications
+###############################################################################
+def replicate(spec: dict[str, Any], max_replications: int = 100, confidence: float = 0.95,
+              target_widths: Optional[dict[str, float]] = None,
+              max_workers: Optional[int] = None, batch_size: Optional[int] = None,
+              base_seed: int = 0) -> dict[str, Any]:
+    """Run independently seeded copies of the given spec in parallel, and return
+    the mean of each statistic with a confidence interval.
+
+    Replication i uses the seed base_seed + i (any seed in spec is ignored).
+    Replications are run in batches of batch_size (by default, the number of
+    workers). After each batch, if every statistic in target_widths has a
+    confidence interval no wider than its target width, no more batches are run.
+    At most max_replications are run in total.
+
+    Return a dictionary with the number of 'replications' run, and the 'stats':
+    for each statistic returned by run_spec, a dictionary with its 'mean', and
+    the 'low' and 'high' ends of its confidence interval.
+
+    Preconditions:
+    - spec is in the format described at the top of this module
+    - max_replications >= 2
+    - 0 < confidence < 1
+    - Every key in target_widths is a statistic returned by run_spec
+    """
+    if batch_size is None:
+        batch_size = max_workers or os.cpu_count() or 1
+    samples = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while len(samples) < max_replications:
+            first = len(samples)
+            batch = [dict(spec, seed=base_seed + i)
+                     for i in range(first, min(first + batch_size, max_replications))]
+            samples.extend(executor.map(run_spec, batch))
+
+            summary = summarize_replications(samples, confidence)
+            if target_widths and len(samples) >= 2 and all(
+                    summary[name]['high'] - summary[name]['low'] <= width
+                    for name, width in target_widths.items()):
+                break
+
+    return {'replications': len(samples), 'stats': summarize_replications(samples, confidence)}
+
+
+def summarize_replications(samples: list[dict[str, int]],
+                           confidence: float) -> dict[str, dict[str, float]]:
+    """Return the mean of each statistic in samples, and the low and high ends of
+    its Student's t confidence interval at the given confidence level.
+
+    With fewer than two samples, the interval is infinitely wide.
+
+    >>> summary = summarize_replications([{'avg_time': 10}, {'avg_time': 14}], 0.95)
+    >>> summary['avg_time']['mean']
+    12.0
+    >>> round(summary['avg_time']['high'], 2)
+    37.41
+
+    Preconditions:
+    - samples != []
+    - Every sample has the same keys
+    - 0 < confidence < 1
+    """
+    summary = {}
+    for name in samples[0]:
+        values = [sample[name] for sample in samples]
+        mean = statistics.fmean(values)
+        if len(values) >= 2:
+            critical = t_critical_value(len(values) - 1, confidence)
+            half_width = critical * statistics.stdev(values) / math.sqrt(len(values))
+        else:
+            half_width = math.inf
+        summary[name] = {'mean': mean, 'low': mean - half_width, 'high': mean + half_width}
+    return summary
+
+
+def t_critical_value(degrees: int, confidence: float) -> float:
+    """Return the critical value of Student's t distribution with the given degrees of
+    freedom for a two-sided interval at the given confidence level.
+
+    Up to 100 degrees of freedom, this solves _t_coverage(t, degrees) == confidence
+    by bisection. Beyond that, the Cornish-Fisher expansion around the normal
+    distribution is accurate to well under 0.001.
+
+    >>> round(t_critical_value(1, 0.95), 3), round(t_critical_value(9, 0.95), 3)
+    (12.706, 2.262)
+    >>> round(t_critical_value(3, 0.99), 3), round(t_critical_value(200, 0.95), 3)
+    (5.841, 1.972)
+
+    Preconditions:
+    - degrees >= 1
+    - 0 < confidence < 1
+    """
+    if degrees <= 100:
+        low, high = 0.0, 1.0
+        while _t_coverage(high, degrees) < confidence:
+            high *= 2
+        for _ in range(60):
+            middle = (low + high) / 2
+            if _t_coverage(middle, degrees) < confidence:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    v = degrees
+    return (z
+            + (z ** 3 + z) / (4 * v)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3))
+
+
+def _t_coverage(t: float, degrees: int) -> float:
+    """Return the probability that a value from Student's t distribution with the
+    given degrees of freedom is between -t and t.
+
+    This is the finite series for whole degrees of freedom from Abramowitz and
+    Stegun, formulas 26.7.3 and 26.7.4.
+
+    Preconditions:
+    - t >= 0
+    - degrees >= 1
+    """
+    theta = math.atan(t / math.sqrt(degrees))
+    cos_squared = math.cos(theta) ** 2
+    if degrees % 2 == 1:
+        total, term = 0.0, math.cos(theta)
+        for k in range(2, degrees, 2):
+            total += term
+            term *= cos_squared * k / (k + 1)
+        return 2 / math.pi * (theta + math.sin(theta) * total)
+
+    total, term = 0.0, 1.0
+    for k in range(1, degrees, 2):
+        total += term
+        term *= cos_squared * k / (k + 1)
+    return math.sin(theta) * total
+
+
+###############################################################################
+# Tournaments
+###############################################################################
+# The statistics for which a higher value is better; for the others, lower is better
+_HIGHER_IS_BETTER = ('total_people', 'people_completed')
+
+
+def run_tournament(spec: dict[str, Any], rank_by: str = 'avg_time',
+                   min_completed: float = 0.9, max_workers: Optional[int] = None,
+                   trace_filename: Optional[str] = None) -> list[dict[str, Any]]:
+    """Run the given spec once with each moving algorithm in MOVING_ALGORITHMS, in
+    parallel, and return a result for each algorithm, best first.
+
+    Every algorithm sees exactly the same arrivals. Unless the spec already uses
+    TraceArrivals, its arrivals are generated (or loaded) only once, here, and
+    recorded to a trace file: to trace_filename if it is given, or otherwise to a
+    temporary file that is deleted afterwards. Each worker process maps the trace
+    file rather than receiving or regenerating the arrivals.
+
+    Each result is a dictionary with the algorithm's 'rank' (starting at 1), its
+    'name', the 'stats' returned by run_spec, and the 'run_time' of its
+    simulation in seconds. Results are ranked by the given statistic, where
+    fewer people or a longer time is worse; ties keep the order of
+    MOVING_ALGORITHMS.
+
+    Wait times only count the people who were delivered, so an algorithm that
+    strands people can have the shortest times. An algorithm that delivered fewer
+    than min_completed times as many people as the best one is therefore ranked
+    below all the algorithms that did not, and such algorithms are ranked by the
+    number of people they delivered first.
+
+    Preconditions:
+    - spec is in the format described at the top of this module, except that it
+      need not have a 'moving_algorithm'
+    - rank_by is a statistic returned by run_spec
+    - 0 <= min_completed <= 1
+    """
+    name, _ = _name_and_kwargs(spec['arrival_generator'])
+    if name == 'TraceArrivals':
+        return _run_tournament(spec, rank_by, min_completed, max_workers)
+    if trace_filename is not None:
+        _record_spec_arrivals(spec, trace_filename)
+        return _run_tournament(dict(spec, arrival_generator={
+            'name': 'TraceArrivals', 'filename': trace_filename}), rank_by, min_completed,
+            max_workers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'arrivals.trace')
+        _record_spec_arrivals(spec, path)
+        return _run_tournament(dict(spec, arrival_generator={
+            'name': 'TraceArrivals', 'filename': path}), rank_by, min_completed, max_workers)
+
+
+def _record_spec_arrivals(spec: dict[str, Any], trace_filename: str) -> None:
+    """Record the arrivals of the given spec, for all its rounds, to a trace file
+    with the given name.
+    """
+    if spec.get('seed') is not None:
+        random.seed(spec['seed'])
+    with build_arrival_generator(spec) as generator:
+        record_arrivals(generator, spec['num_rounds'], trace_filename)
+
+
+def _run_tournament(spec: dict[str, Any], rank_by: str, min_completed: float,
+                    max_workers: Optional[int]) -> list[dict[str, Any]]:
+    """Run and rank the tournament for the given spec, which uses TraceArrivals."""
+    names = list(MOVING_ALGORITHMS)
+    specs = [dict(spec, moving_algorithm=name) for name in names]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        runs = list(executor.map(_run_timed, specs))
+
+    results = [{'name': name, 'stats': stats, 'run_time': run_time}
+               for name, (stats, run_time) in zip(names, runs)]
+    sign = -1 if rank_by in _HIGHER_IS_BETTER else 1
+    most_completed = max(result['stats']['people_completed'] for result in results)
+    results.sort(key=lambda result: _tournament_rank_key(
+        result['stats'], rank_by, sign, min_completed * most_completed))
+    for rank, result in enumerate(results, 1):
+        result['rank'] = rank
+    return results
+
+
+def _tournament_rank_key(stats: dict[str, int], rank_by: str, sign: int,
+                         enough_completed: float) -> tuple[bool, int, int]:
+    """Return the key that ranks a tournament result with the given stats.
+
+    Results that delivered at least enough_completed people come first, ranked by
+    sign times the rank_by statistic. The rest follow, ranked by the number of
+    people they delivered (most first), and then in the same way.
+    """
+    completed = stats['people_completed']
+    if completed >= enough_completed:
+        return False, 0, sign * stats[rank_by]
+    return True, -completed, sign * stats[rank_by]
+
+
+def format_tournament(results: list[dict[str, Any]]) -> str:
+    """Return the given tournament results as a table, one row per algorithm.
+
+    >>> print(format_tournament([
+    ...     {'rank': 1, 'name': 'FurthestFloor', 'run_time': 0.25,
+    ...      'stats': {'people_completed': 9, 'avg_time': 4, 'p90_time': 6, 'max_time': 8}},
+    ...     {'rank': 2, 'name': 'EndToEndLoop', 'run_time': 0.5,
+    ...      'stats': {'people_completed': 9, 'avg_time': 7, 'p90_time': 9, 'max_time': 12}}
+    ... ]))
+    rank  algorithm        completed  avg_time  p90_time  max_time  run_time
+       1  FurthestFloor            9         4         6         8     0.25s
+       2  EndToEndLoop             9         7         9        12     0.50s
+    """
+    lines = [f'{"rank":>4}  {"algorithm":15}  {"completed":>9}  {"avg_time":>8}  '
+             f'{"p90_time":>8}  {"max_time":>8}  {"run_time":>8}']
+    for result in results:
+        stats = result['stats']
+        lines.append(f'{result["rank"]:>4}  {result["name"]:15}  '
+                     f'{stats["people_completed"]:>9}  {stats["avg_time"]:>8}  '
+                     f'{stats["p90_time"]:>8}  {stats["max_time"]:>8}  '
+                     f'{result["run_time"]:>7.2f}s')
+    return '\n'.join(lines)
+
+
+###############################################################################
+# Branches
+###############################################################################
+# The simulation that worker processes of run_branches fork their branches from
+_branch_root: Optional[Simulation] = None
+
+
+def run_branches(simulation: Simulation, branches: list[dict[str, Any]], num_rounds: int,
+                 max_workers: Optional[int] = None) -> list[dict[str, int]]:
+    """Fork the given simulation once for each of the given branches, run each fork
+    for num_rounds more rounds in parallel, and return their statistics in the same
+    order as branches.
+
+    Each branch is a dictionary of overrides for Simulation.fork, e.g.
+    {'moving_algorithm': FurthestFloor()}. The given simulation is not changed.
+
+    Where the operating system supports it, worker processes are started by
+    forking this process, so they share the simulation's memory with it (copying
+    only the pages they change) rather than receiving a pickled copy.
+
+    Preconditions:
+    - num_rounds >= 1
+    """
+    global _branch_root
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        initargs = ()
+    else:
+        context = None
+        initargs = (simulation,)
+
+    _branch_root = simulation
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                 initializer=_set_branch_root, initargs=initargs) as executor:
+            return list(executor.map(_run_branch, branches, [num_rounds] * len(branches)))
+    finally:
+        _branch_root = None
+
+
+def _set_branch_root(simulation: Optional[Simulation] = None) -> None:
+    """Set the simulation this worker process forks branches from, unless it was
+    inherited when the process was forked.
+    """
+    global _branch_root
+    if simulation is not None:
+        _branch_root = simulation
+
+
+def _run_branch(overrides: dict[str, Any], num_rounds: int) -> dict[str, int]:
+    """Fork the branch root simulation with the given overrides, run the fork for the
+    given number of rounds, and return its statistics.
+
+    The fork's arrival generator is closed afterwards, unless it is the branch
+    root's own (see ArrivalGenerator.fork), which later branches still need.
+    """
+    branch = _branch_root.fork(**overrides)
+    stats = branch.run(num_rounds)
+    if branch.arrival_generator is not _branch_root.arrival_generator:
+        branch.arrival_generator.close()
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a sweep of headless simulations.')
+    parser.add_argument('specs', help='a JSON file with a list of specs, or a grid')
+    parser.add_argument('results', help='the file to write results to, one JSON line each')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of worker processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='the seed of the first spec (or replication) without a seed')
+    parser.add_argument('--replications', type=int, default=None,
+                        help='replicate each spec up to this many times, and write the '
+                             'confidence interval of each statistic instead of one run')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='the confidence level of the intervals (default: 0.95)')
+    parser.add_argument('--target-width', action='append', default=[], metavar='STAT=WIDTH',
+                        help='stop replicating a spec once the interval for STAT is at '
+                             'most WIDTH wide (may be repeated)')
+    parser.add_argument('--tournament', action='store_true',
+                        help='run each spec with every moving algorithm on the same '
+                             'arrivals, and print the algorithms ranked')
+    parser.add_argument('--rank-by', default='avg_time', metavar='STAT',
+                        help='the statistic that tournaments rank by (default: avg_time)')
+    args = parser.parse_args()
+
+    with open(args.specs) as specs_file:
+        loaded = json.load(specs_file)
+    sweep_specs = expand_grid(loaded) if isinstance(loaded, dict) else loaded
+
+    if args.tournament:
+        with open(args.results, 'w') as results_file:
+            for spec_index, sweep_spec in enumerate(sweep_specs):
+                sweep_spec.setdefault('seed', args.seed + spec_index)
+                ranked = run_tournament(sweep_spec, args.rank_by,
+                                        max_workers=args.workers)
+                print(format_tournament(ranked) + '\n')
+                results_file.write(json.dumps({'index': spec_index, 'spec': sweep_spec,
+                                               'results': ranked}) + '\n')
+                results_file.flush()
+    elif args.replications is None:
+        run_sweep(sweep_specs, args.results, args.workers, args.seed)
+    else:
+        widths = {stat: float(width) for stat, width in
+                  (target.split('=') for target in args.target_width)}
+        with open(args.results, 'w') as results_file:
+            for spec_index, sweep_spec in enumerate(sweep_specs):
+                replicated = replicate(sweep_spec, args.replications, args.confidence, widths,
+                                       args.workers, base_seed=args.seed)
+                replicated.update(index=spec_index, spec=sweep_spec)
+                results_file.write(json.dumps(replicated) + '\n')
+                results_file.flush()
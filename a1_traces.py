@@ -0,0 +1,293 @@
+"""CSC148 Assignment 1 - Binary arrival traces
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains a compact binary format for arrival files, and
+TraceArrivals, an arrival generator that reads it.
+
+Parsing a large CSV file of arrivals (as FileArrivals does) takes much longer
+than running the simulation on it. A trace file holds the same arrivals as
+fixed-width records, so TraceArrivals can memory-map it and read any round's
+arrivals straight out of the file, without parsing anything. Since the file is
+only ever read, several processes replaying the same trace share one copy of
+it in the operating system's page cache.
+
+A trace file contains, in order:
+- A header: the magic bytes b'A1TRACE\\0', the format version, a marker
+  used to check the file's byte order, the number of indexed rounds R (one
+  more than the last round with an arrival), and the number of records N.
+  See _HEADER.
+- The round index: R + 1 64-bit integers. The records for round r are
+  records index[r] (inclusive) to index[r + 1] (exclusive).
+- The records: N triples of 32-bit integers (round, start floor, target floor),
+  sorted by round. People who arrive in the same round are kept in the order
+  they appear in the original file.
+
+To convert a CSV file in the FileArrivals format, run this module:
+
+    python a1_traces.py data/sample_arrivals.csv data/sample_arrivals.trace
+"""
+from __future__ import annotations
+import csv
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, Iterable, Optional
+
+from a1_contracts import check_contracts
+from a1_algorithms import ArrivalGenerator
+from a1_entities import Person
+
+# The header: magic bytes, version, byte order marker, number of rounds, number of records
+_HEADER = struct.Struct('=8sIIqq')
+_MAGIC = b'A1TRACE\0'
+_VERSION = 1
+# Written in the machine's own byte order, so a file written on a machine with the
+# other byte order can be recognized.
+_BYTE_ORDER_MARK = 0x01020304
+
+
+###############################################################################
+# Writing traces
+###############################################################################
+def write_trace(filename: str, records: Iterable[tuple[int, int, int]]) -> int:
+    """Write the given (round, start floor, target floor) records to a new trace file
+    with the given name, and return the number of records written.
+
+    The records are sorted by round; records for the same round keep their order.
+
+    Preconditions:
+    - Every round number in records is >= 0
+    """
+    rounds, people = array('i'), array('i')
+    is_sorted = True
+    for round_num, start, target in records:
+        if rounds and round_num < rounds[-1]:
+            is_sorted = False
+        rounds.append(round_num)
+        people.append(start)
+        people.append(target)
+
+    if not is_sorted:
+        order = sorted(range(len(rounds)), key=rounds.__getitem__)
+        rounds = array('i', [rounds[i] for i in order])
+        people = array('i', [people[2 * i + j] for i in order for j in (0, 1)])
+
+    # index[r] is the number of records before round r
+    num_rounds = rounds[-1] + 1 if rounds else 0
+    index = array('q', [0] * (num_rounds + 1))
+    for round_num in rounds:
+        index[round_num + 1] += 1
+    for round_num in range(num_rounds):
+        index[round_num + 1] += index[round_num]
+
+    data = array('i', [0] * (3 * len(rounds)))
+    data[0::3] = rounds
+    data[1::3] = people[0::2]
+    data[2::3] = people[1::2]
+
+    with open(filename, 'wb') as trace_file:
+        trace_file.write(_HEADER.pack(_MAGIC, _VERSION, _BYTE_ORDER_MARK,
+                                      num_rounds, len(rounds)))
+        index.tofile(trace_file)
+        data.tofile(trace_file)
+    return len(rounds)
+
+
+def convert_csv(csv_filename: str, trace_filename: str) -> int:
+    """Convert the given CSV file of arrivals to a trace file, and return the number
+    of people in it.
+
+    Preconditions:
+    - <csv_filename> refers to a valid CSV file, in the format read by FileArrivals
+    """
+    with open(csv_filename) as csvfile:
+        return write_trace(trace_filename, _csv_records(csv.reader(csvfile)))
+
+
+def record_arrivals(generator: ArrivalGenerator, num_rounds: int, trace_filename: str) -> int:
+    """Write the arrivals the given generator makes in rounds 0 to num_rounds - 1 to a
+    trace file, and return the number of people in it.
+
+    Replaying the trace with TraceArrivals gives the same arrivals, without the cost
+    of generating them.
+
+    Preconditions:
+    - num_rounds >= 0
+
+    >>> import os, tempfile
+    >>> from a1_algorithms import UniformArrivals
+    >>> path = os.path.join(tempfile.mkdtemp(), 'uniform.trace')
+    >>> record_arrivals(UniformArrivals(5, 2, seed=1), 10, path)
+    20
+    >>> trace = TraceArrivals(5, path)
+    >>> repr(trace.generate(4)) == repr(UniformArrivals(5, 2, seed=1).generate(4))
+    True
+    >>> trace.close()
+    """
+    return write_trace(trace_filename, _generator_records(generator, num_rounds))
+
+
+def _generator_records(generator: ArrivalGenerator,
+                       num_rounds: int) -> Iterable[tuple[int, int, int]]:
+    """Yield a (round, start floor, target floor) record for each person the given
+    generator makes in rounds 0 to num_rounds - 1.
+    """
+    for round_num in range(num_rounds):
+        for start, people in generator.generate(round_num).items():
+            for person in people:
+                yield round_num, start, person.target
+
+
+def _csv_records(reader: Iterable[list[str]]) -> Iterable[tuple[int, int, int]]:
+    """Yield a (round, start floor, target floor) record for each person in the
+    given rows of a CSV file of arrivals.
+    """
+    for line in reader:
+        if not line:
+            continue
+        round_num = int(line[0])
+        i = 1
+        while i < len(line):
+            yield round_num, int(line[i]), int(line[i + 1])
+            i += 2
+
+
+###############################################################################
+# Reading traces
+###############################################################################
+@check_contracts
+class TraceArrivals(ArrivalGenerator):
+    """Generate arrivals from a trace file, which is memory-mapped rather than read.
+
+    Generating the arrivals for any round takes time proportional to the number of
+    people arriving in that round, no matter how big the file is. On a trace
+    converted from a CSV file, this generates the same arrivals as FileArrivals.
+
+    Instance Attributes:
+    - filename: the name of the trace file
+    - num_records: the number of people in the trace file
+
+    Representation Invariants:
+    - self.num_records >= 0
+    """
+    filename: str
+    num_records: int
+
+    def __init__(self, max_floor: int, filename: str) -> None:
+        """Initialize a new TraceArrivals algorithm from the given trace file.
+
+        Raise a ValueError if the file is not a trace file that can be read on this
+        machine.
+
+        Preconditions:
+        - <filename> was written by write_trace or convert_csv
+        """
+        ArrivalGenerator.__init__(self, max_floor)
+        self.filename = filename
+        self._open()
+
+    def generate(self, round_num: int) -> dict[int, list[Person]]:
+        """Return the new arrivals for the simulation at the given round.
+
+        Preconditions:
+        - round_num >= 0
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'example.trace')
+        >>> write_trace(path, [(3, 1, 4), (0, 2, 1), (3, 5, 1)])
+        3
+        >>> trace = TraceArrivals(5, path)
+        >>> trace.generate(3)
+        {1: [Person(start=1, target=4, wait_time=0)], 5: [Person(start=5, target=1, wait_time=0)]}
+        >>> trace.next_arrival_round(1)
+        3
+        >>> trace.close()
+        """
+        if round_num >= self._num_rounds:
+            return {}
+
+        first, last = self._index[round_num], self._index[round_num + 1]
+        starts = self._records[3 * first + 1:3 * last:3].tolist()
+        targets = self._records[3 * first + 2:3 * last:3].tolist()
+
+        arrivals = {}
+        for start, target in zip(starts, targets):
+            if start in arrivals:
+                arrivals[start].append(Person(start, target))
+            else:
+                arrivals[start] = [Person(start, target)]
+        return arrivals
+
+    def next_arrival_round(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after round_num with at least one arrival
+        in the trace, or None if there are no more.
+
+        Preconditions:
+        - round_num >= 0
+        """
+        if round_num >= self._num_rounds:
+            return None
+        # The first record at or after round_num is at the start of round_num's records
+        first = self._index[round_num]
+        if first == self.num_records:
+            return None
+        return self._records[3 * first]
+
+    def close(self) -> None:
+        """Release the memory map and close the file."""
+        self._records.release()
+        self._index.release()
+        self._map.close()
+        self._file.close()
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Return the state of this generator for pickling.
+
+        Only the file name is pickled: each process that unpickles this generator
+        maps the same file again, and the operating system shares its pages.
+        """
+        state = self.__dict__.copy()
+        for name in ('_file', '_map', '_index', '_records'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore this generator from the given pickled state, reopening its file."""
+        self.__dict__.update(state)
+        self._open()
+
+    def _open(self) -> None:
+        """Open and memory-map this generator's file, and check its header."""
+        self._file = open(self.filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f'{self.filename} is not an arrival trace file')
+
+        magic, version, mark, num_rounds, num_records = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'{self.filename} is not an arrival trace file')
+        if mark != _BYTE_ORDER_MARK:
+            raise ValueError(f'{self.filename} was written on a machine with a different '
+                             f'byte order')
+
+        self._num_rounds = num_rounds
+        self.num_records = num_records
+        index_end = _HEADER.size + 8 * (num_rounds + 1)
+        view = memoryview(self._map)
+        self._index = view[_HEADER.size:index_end].cast('q')
+        self._records = view[index_end:index_end + 12 * num_records].cast('i')
+        view.release()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        num_people = convert_csv(sys.argv[1], sys.argv[2])
+        print(f'Wrote {num_people} people to {sys.argv[2]}')
+    else:
+        import doctest
+        doctest.testmod()
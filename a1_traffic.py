@@ -0,0 +1,211 @@
+"""CSC148 Assignment 1 - Synthetic traffic
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains PoissonArrivals, an arrival generator for realistic,
+randomly generated traffic.
+
+People arrive at random: the number of people going from each floor to each
+other floor in a round follows a Poisson distribution. The expected numbers are
+given by an origin-destination (OD) matrix, which is a mix of three patterns:
+- up-peak: everyone starts on the lobby and goes up to another floor
+- down-peak: everyone starts on another floor and goes down to the lobby
+- interfloor: people travel between any two different floors (uniformly, unless
+  an OD matrix is given)
+
+A traffic profile says how busy the building is and how the patterns are mixed,
+and can change over the course of a day (see TRAFFIC_PROFILES). For example,
+the 'daily' profile has a morning up-peak, a lunch rush in both directions, an
+evening down-peak, and quiet nights.
+
+Each round's arrivals are drawn in one batch from a NumPy random generator seeded
+with the generator's seed and the round number, so they are the same every time,
+whatever order the rounds are asked for in.
+"""
+from __future__ import annotations
+import bisect
+import random
+from typing import Any, Optional
+
+import numpy as np
+
+from a1_contracts import check_contracts
+from a1_algorithms import ArrivalGenerator
+from a1_entities import Person
+
+# Traffic profiles, by name. Each profile is a list of periods, in order of start
+# time. Each period is a tuple of:
+# - the time of day the period starts, as a fraction of the day
+# - the rate multiplier: the expected number of arrivals per round in the period,
+#   as a multiple of the generator's rate
+# - the weights of the up-peak, down-peak and interfloor patterns in the period
+TRAFFIC_PROFILES: dict[str, list[tuple[float, float, tuple[float, float, float]]]] = {
+    'interfloor': [(0.0, 1.0, (0.0, 0.0, 1.0))],
+    'up-peak': [(0.0, 1.0, (0.85, 0.05, 0.1))],
+    'down-peak': [(0.0, 1.0, (0.05, 0.85, 0.1))],
+    'lunch': [(0.0, 1.0, (0.45, 0.45, 0.1))],
+    'daily': [
+        (0.0, 0.05, (0.0, 0.0, 1.0)),       # Night
+        (0.3, 1.0, (0.85, 0.05, 0.1)),      # Morning up-peak, from about 7:15
+        (0.4, 0.4, (0.2, 0.2, 0.6)),        # Mid-morning
+        (0.49, 0.8, (0.45, 0.45, 0.1)),     # Lunch, from about 11:45
+        (0.56, 0.4, (0.2, 0.2, 0.6)),       # Afternoon
+        (0.7, 1.0, (0.05, 0.85, 0.1)),      # Evening down-peak, from about 16:45
+        (0.78, 0.2, (0.0, 0.5, 0.5)),       # Evening
+        (0.9, 0.05, (0.0, 0.0, 1.0)),       # Night
+    ],
+}
+
+
+@check_contracts
+class PoissonArrivals(ArrivalGenerator):
+    """An arrival generator with Poisson arrivals following a traffic profile.
+
+    Instance Attributes:
+    - rate: the expected number of people arriving in a round at the busiest
+        times of the profile (i.e., with a rate multiplier of 1)
+    - profile: the name of the traffic profile, a key of TRAFFIC_PROFILES
+    - rounds_per_day: the number of rounds in a day, for profiles that change
+        over the day
+    - lobby: the floor that up-peak traffic starts on and down-peak traffic ends on
+    - seed: the seed used to draw the arrivals
+
+    Representation Invariants:
+    - self.rate >= 0
+    - self.profile in TRAFFIC_PROFILES
+    - self.rounds_per_day >= 1
+    - 1 <= self.lobby <= self.max_floor
+
+    >>> generator = PoissonArrivals(10, 3.0, 'up-peak', seed=7)
+    >>> repr(generator.generate(5)) == repr(PoissonArrivals(10, 3.0, 'up-peak', seed=7).generate(5))
+    True
+    >>> starts, targets = generator.generate_arrays(5)
+    >>> bool((starts != targets).all())
+    True
+    """
+    rate: float
+    profile: str
+    rounds_per_day: int
+    lobby: int
+    seed: int
+
+    def __init__(self, max_floor: int, rate: float, profile: str = 'interfloor',
+                 rounds_per_day: int = 1440, lobby: int = 1,
+                 od_matrix: Optional[Any] = None, seed: Optional[int] = None) -> None:
+        """Initialize a new PoissonArrivals generator.
+
+        od_matrix, if given, replaces the uniform interfloor pattern: entry [i][j] is
+        the relative amount of traffic from floor i + 1 to floor j + 1. So its row
+        sums are the relative arrival rates of the floors. Its diagonal is ignored.
+
+        If seed is None, a seed is chosen using the random module, so calling
+        random.seed first makes the arrivals reproducible.
+
+        Preconditions:
+        - max_floor >= 2
+        - rate >= 0
+        - profile in TRAFFIC_PROFILES
+        - rounds_per_day >= 1
+        - 1 <= lobby <= max_floor
+        - od_matrix is None or it is a max_floor by max_floor matrix of non-negative
+          numbers, with at least one positive entry off the diagonal
+        """
+        ArrivalGenerator.__init__(self, max_floor)
+        self.rate = rate
+        self.profile = profile
+        self.rounds_per_day = rounds_per_day
+        self.lobby = lobby
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+
+        patterns = _traffic_patterns(max_floor, lobby, od_matrix)
+
+        # For each period of the profile: its first round of the day, its expected
+        # number of arrivals per round, the flattened OD matrix cells it can draw
+        # (cell i * max_floor + j is floor i + 1 to floor j + 1), and the cumulative
+        # weights of those cells.
+        self._period_starts = []
+        self._period_rates = []
+        self._period_cells = []
+        self._period_weights = []
+        for start, multiplier, mix in TRAFFIC_PROFILES[profile]:
+            matrix = sum(weight * pattern for weight, pattern in zip(mix, patterns))
+            cells = np.flatnonzero(matrix)
+            self._period_starts.append(int(start * rounds_per_day))
+            self._period_rates.append(rate * multiplier)
+            self._period_cells.append(cells)
+            self._period_weights.append(np.cumsum(matrix.ravel()[cells]))
+
+    def generate(self, round_num: int) -> dict[int, list[Person]]:
+        """Return the new arrivals for the simulation at the given round.
+
+        Preconditions:
+        - round_num >= 0
+        """
+        starts, targets = self.generate_arrays(round_num)
+        arrivals = {}
+        for start, target in zip(starts.tolist(), targets.tolist()):
+            if start in arrivals:
+                arrivals[start].append(Person(start, target))
+            else:
+                arrivals[start] = [Person(start, target)]
+        return arrivals
+
+    def generate_arrays(self, round_num: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the starting and target floors of the people arriving at the given
+        round, in the order they arrive, as two arrays.
+
+        These are the same people that generate returns, without building a
+        Person for each of them.
+
+        Preconditions:
+        - round_num >= 0
+        """
+        period = bisect.bisect_right(self._period_starts,
+                                     round_num % self.rounds_per_day) - 1
+        rng = np.random.default_rng([self.seed, round_num])
+        num_people = rng.poisson(self._period_rates[period])
+
+        weights = self._period_weights[period]
+        draws = rng.random(num_people) * weights[-1]
+        cells = self._period_cells[period][np.searchsorted(weights, draws, side='right')]
+        return cells // self.max_floor + 1, cells % self.max_floor + 1
+
+
+def _traffic_patterns(max_floor: int, lobby: int,
+                      od_matrix: Optional[Any]) -> list[np.ndarray]:
+    """Return the up-peak, down-peak and interfloor OD matrices for a building, each
+    scaled so its entries add up to 1.
+
+    Entry [i, j] of each matrix is the share of traffic from floor i + 1 to floor j + 1.
+
+    >>> up, down, interfloor = _traffic_patterns(3, 1, None)
+    >>> up.tolist()
+    [[0.0, 0.5, 0.5], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
+    >>> down[:, 0].tolist()
+    [0.0, 0.5, 0.5]
+    """
+    others = np.ones(max_floor)
+    others[lobby - 1] = 0
+
+    up = np.zeros((max_floor, max_floor))
+    up[lobby - 1] = others
+    down = np.zeros((max_floor, max_floor))
+    down[:, lobby - 1] = others
+
+    if od_matrix is None:
+        interfloor = np.ones((max_floor, max_floor))
+    else:
+        interfloor = np.array(od_matrix, dtype=float)
+    np.fill_diagonal(interfloor, 0)
+
+    return [pattern / pattern.sum() for pattern in (up, down, interfloor)]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
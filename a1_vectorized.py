@@ -0,0 +1,400 @@
+"""CSC148 Assignment 1 - Vectorized simulation
+
+=== CSC148 Fall 2023 ===
+Department of Computer Science,
+University of Toronto
+
+=== Module description ===
+This module contains VectorizedSimulation, an alternative engine to the
+Simulation class in a1_simulation.py, meant for very large buildings.
+
+Instead of lists of Person and Elevator objects, a VectorizedSimulation stores
+its state in NumPy arrays: one entry per person who has arrived, and one entry
+(or row) per elevator. The work done in each stage of a round depends only on
+the people arriving, boarding and leaving in that round, and on the number of
+floors and elevators, never on how many people are in the building:
+- New arrivals are appended to preallocated person buffers, which grow by
+  doubling, and linked onto the back of their floor's queue in one batch.
+- Boarding takes people from the front of the queues of the floors that have an
+  elevator with free space on them.
+- Each elevator's passengers are kept in a row of a per-elevator rider table,
+  so disembarking only compares the riders' targets with their elevators'
+  floors.
+- The moving algorithms are given the number of people waiting on each floor.
+
+A VectorizedSimulation accepts the same configuration dictionary as Simulation,
+and its run method returns the same statistics. It is always headless (the
+'visualize' setting is ignored), and it only supports the moving algorithms in
+VECTORIZED_ALGORITHMS.
+"""
+from typing import Any, Callable
+
+import numpy as np
+
+from a1_contracts import check_contracts
+import a1_algorithms
+
+
+# The number of people the person buffers of a new VectorizedSimulation have room for
+_INITIAL_BUFFER_SIZE = 1024
+
+
+###############################################################################
+# Vectorized moving algorithms
+###############################################################################
+def end_to_end_loop_targets(floors: np.ndarray, targets: np.ndarray,
+                            waiting_counts: np.ndarray, max_floor: int) -> np.ndarray:
+    """Return the new target floors chosen by EndToEndLoop.
+
+    The parameters are:
+    - floors: the current floor of each elevator
+    - targets: the current target floor of each elevator
+    - waiting_counts: the number of people waiting on each floor (index 0 is unused)
+    - max_floor: the maximum floor number in the simulation
+
+    >>> end_to_end_loop_targets(np.array([1, 3, 5]), np.array([1, 5, 5]), np.zeros(6), 5)
+    array([5, 5, 1])
+    """
+    targets = np.where(floors == 1, max_floor, targets)
+    return np.where(floors == max_floor, 1, targets)
+
+
+def furthest_floor_targets(floors: np.ndarray, targets: np.ndarray,
+                           waiting_counts: np.ndarray, max_floor: int) -> np.ndarray:
+    """Return the new target floors chosen by FurthestFloor.
+
+    The parameters are the same as for end_to_end_loop_targets. Only the lowest
+    and highest floors with someone waiting can ever be chosen, so this only
+    needs those two floors.
+
+    >>> furthest_floor_targets(np.array([3, 1]), np.array([3, 1]),
+    ...                        np.array([0, 0, 1, 0, 0, 2]), 5)
+    array([5, 5])
+    """
+    occupied = np.flatnonzero(waiting_counts)
+    if occupied.size == 0:
+        return targets
+
+    lowest, highest = occupied[0], occupied[-1]
+    has_above = highest > floors
+    has_below = lowest < floors
+    go_up = has_above & (~has_below | (highest - floors >= floors - lowest))
+    return np.where(go_up, highest, np.where(has_below, lowest, targets))
+
+
+# The vectorized version of each supported moving algorithm, keyed by its class.
+# Each function is given the arrays described in end_to_end_loop_targets.
+VECTORIZED_ALGORITHMS: dict[type, Callable[..., np.ndarray]] = {
+    a1_algorithms.EndToEndLoop: end_to_end_loop_targets,
+    a1_algorithms.FurthestFloor: furthest_floor_targets,
+}
+
+
+###############################################################################
+# The vectorized simulation
+###############################################################################
+@check_contracts
+class VectorizedSimulation:
+    """A headless simulation whose state is stored in NumPy arrays.
+
+    Each person is numbered in the order they arrived, and their number is their
+    index in the person buffers. The people waiting on each floor form a queue,
+    stored as a linked list through the person buffers: a floor's queue starts at
+    its head person, and each person's next person is the one behind them.
+
+    Instance Attributes:
+    - arrival_generator: the algorithm used to generate new arrivals.
+    - moving_algorithm: the algorithm used to decide how to move elevators
+    - num_floors: the number of floors
+    - elevator_capacity: the maximum number of people on each elevator
+    - elevator_floors: the current floor of each elevator
+    - elevator_targets: the target floor of each elevator
+    - elevator_loads: the number of passengers on each elevator
+    - rider_targets: rider_targets[e, i] is the target floor of passenger i of
+        elevator e, for i < elevator_loads[e], and 0 for the empty seats after them
+    - rider_arrivals: rider_arrivals[e, i] is the round in which passenger i of
+        elevator e arrived, for i < elevator_loads[e]
+    - waiting_counts: the number of people waiting on each floor (index 0 is unused)
+    - person_targets: the target floor of each person who has arrived, followed by
+        unused space
+    - person_arrivals: the round in which each person who has arrived did so,
+        followed by unused space
+    - num_rounds: the number of rounds that have been run
+    - total_arrivals: the number of people who have arrived so far
+
+    Representation Invariants:
+    - self.num_floors >= 2
+    - self.elevator_capacity >= 1
+    - len(self.elevator_floors) >= 1
+    - len(self.elevator_floors) == len(self.elevator_targets) == len(self.elevator_loads)
+    - self.rider_targets.shape == (len(self.elevator_floors), self.elevator_capacity)
+    - self.rider_arrivals.shape == self.rider_targets.shape
+    - len(self.waiting_counts) == self.num_floors + 1
+    - len(self.person_targets) == len(self.person_arrivals) >= self.total_arrivals
+    """
+    arrival_generator: a1_algorithms.ArrivalGenerator
+    moving_algorithm: a1_algorithms.MovingAlgorithm
+    num_floors: int
+    elevator_capacity: int
+    elevator_floors: np.ndarray
+    elevator_targets: np.ndarray
+    elevator_loads: np.ndarray
+    rider_targets: np.ndarray
+    rider_arrivals: np.ndarray
+    waiting_counts: np.ndarray
+    person_targets: np.ndarray
+    person_arrivals: np.ndarray
+    num_rounds: int
+    total_arrivals: int
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """Initialize a new vectorized simulation using the given configuration.
+
+        Raise a ValueError if config['moving_algorithm'] has no vectorized
+        version in VECTORIZED_ALGORITHMS.
+
+        Preconditions:
+        - config is a dictionary in the format accepted by Simulation
+        - config['num_floors'] >= 2
+        - config['elevator_capacity'] >= 1
+        - config['num_elevators'] >= 1
+        """
+        self.arrival_generator = config['arrival_generator']
+        self.moving_algorithm = config['moving_algorithm']
+        if type(self.moving_algorithm) not in VECTORIZED_ALGORITHMS:
+            raise ValueError(f'{type(self.moving_algorithm).__name__} has no vectorized version')
+        self._targets_for = VECTORIZED_ALGORITHMS[type(self.moving_algorithm)]
+
+        self.num_floors = config['num_floors']
+        self.elevator_capacity = config['elevator_capacity']
+
+        # Every elevator starts on the first floor, with no passengers
+        num_elevators = config['num_elevators']
+        self.elevator_floors = np.ones(num_elevators, dtype=np.int64)
+        self.elevator_targets = np.ones(num_elevators, dtype=np.int64)
+        self.elevator_loads = np.zeros(num_elevators, dtype=np.int64)
+        self.rider_targets = np.zeros((num_elevators, self.elevator_capacity), dtype=np.int32)
+        self.rider_arrivals = np.zeros((num_elevators, self.elevator_capacity), dtype=np.int32)
+
+        # Nobody is in the building yet. _heads[f] and _tails[f] are the first and
+        # last people in floor f's queue, and _next[p] is the person behind person p;
+        # they are only meaningful while the queue is not empty.
+        self.waiting_counts = np.zeros(self.num_floors + 1, dtype=np.int64)
+        self._heads = np.zeros(self.num_floors + 1, dtype=np.int64)
+        self._tails = np.zeros(self.num_floors + 1, dtype=np.int64)
+        self.person_targets = np.zeros(_INITIAL_BUFFER_SIZE, dtype=np.int32)
+        self.person_arrivals = np.zeros(_INITIAL_BUFFER_SIZE, dtype=np.int32)
+        self._next = np.zeros(_INITIAL_BUFFER_SIZE, dtype=np.int64)
+
+        # Initialize tracking attributes
+        self.num_rounds = 0
+        self.total_arrivals = 0
+        self._num_completed = 0
+        self._total_time = 0
+        self._max_time = -1
+
+    ############################################################################
+    # Handle rounds of simulation.
+    ############################################################################
+    def run(self, num_rounds: int) -> dict[str, int]:
+        """Run the simulation for the given number of rounds.
+
+        Return the same statistics as Simulation.run. As with Simulation.run, each
+        call continues from where the last one stopped, and the statistics cover
+        every round run so far.
+
+        Preconditions:
+        - num_rounds >= 1
+        """
+        for i in range(self.num_rounds, self.num_rounds + num_rounds):
+            # Stage 1: elevator disembarking
+            self.handle_disembarking(i)
+
+            # Stage 2: new arrivals
+            self.generate_arrivals(i)
+
+            # Stage 3: elevator boarding
+            self.handle_boarding()
+
+            # Stage 4: move the elevators
+            self.move_elevators()
+
+            # Stage 5: update wait times. Nothing to do here: a person's wait
+            # time is the number of rounds since they arrived, and is only
+            # calculated when they reach their target floor.
+            self.num_rounds += 1
+
+        return self._calculate_stats()
+
+    def handle_disembarking(self, round_num: int) -> None:
+        """Remove every passenger whose elevator is on their target floor, and
+        record how long they waited.
+
+        Only the rider table is looked at, so this takes time proportional to the
+        number of elevators times their capacity. Empty seats have target floor 0,
+        so no passenger is ever found in them.
+        """
+        leaving = self.rider_targets == self.elevator_floors[:, None]
+        elevators = np.flatnonzero(leaving.any(axis=1))
+        if elevators.size == 0:
+            return
+
+        leaving = leaving[elevators]
+        wait_times = round_num - self.rider_arrivals[elevators][leaving].astype(np.int64)
+        self._num_completed += len(wait_times)
+        self._total_time += int(wait_times.sum())
+        self._max_time = max(self._max_time, int(wait_times.max()))
+
+        # Move the passengers who stay to the front of their elevator's row, in order,
+        # and empty the seats after them
+        targets = self.rider_targets[elevators]
+        staying = (targets != 0) & ~leaving
+        loads = staying.sum(axis=1)
+        seated = np.arange(self.elevator_capacity) < loads[:, None]
+        for table in (self.rider_targets, self.rider_arrivals):
+            rows = table[elevators]
+            new_rows = np.zeros_like(rows)
+            new_rows[seated] = rows[staying]
+            table[elevators] = new_rows
+        self.elevator_loads[elevators] = loads
+
+    def generate_arrivals(self, round_num: int) -> None:
+        """Generate new arrivals and add them to the back of their floor's queue.
+
+        Generators with a generate_arrays method (such as PoissonArrivals) give their
+        arrivals as arrays of starting and target floors, so no Person is ever built.
+        Only the order of the people on each floor matters, and that is the same
+        either way.
+        """
+        if hasattr(self.arrival_generator, 'generate_arrays'):
+            starts, targets = self.arrival_generator.generate_arrays(round_num)
+        else:
+            starts, targets = [], []
+            for new_people in self.arrival_generator.generate(round_num).values():
+                for person in new_people:
+                    starts.append(person.start)
+                    targets.append(person.target)
+        num_new = len(starts)
+        if num_new == 0:
+            return
+
+        first = self.total_arrivals
+        self._reserve(first + num_new)
+        self.person_targets[first:first + num_new] = targets
+        self.person_arrivals[first:first + num_new] = round_num
+        self.total_arrivals += num_new
+
+        # Group the new people by floor, keeping their order, and link each group
+        # into a list
+        starts = np.asarray(starts, dtype=np.int64)
+        order = np.argsort(starts, kind='stable')
+        floors = starts[order]
+        people = first + order
+        same_floor = floors[1:] == floors[:-1]
+        self._next[people[:-1][same_floor]] = people[1:][same_floor]
+
+        # Put each group at the back of its floor's queue
+        group_starts = np.flatnonzero(np.concatenate(([True], ~same_floor)))
+        group_ends = np.append(group_starts[1:], num_new) - 1
+        group_floors = floors[group_starts]
+        was_empty = self.waiting_counts[group_floors] == 0
+        self._heads[group_floors[was_empty]] = people[group_starts[was_empty]]
+        self._next[self._tails[group_floors[~was_empty]]] = people[group_starts[~was_empty]]
+        self._tails[group_floors] = people[group_ends]
+        self.waiting_counts[group_floors] += group_ends - group_starts + 1
+
+    def handle_boarding(self) -> None:
+        """Board waiting people onto elevators on their floor.
+
+        This matches Simulation.handle_boarding: on each floor, the elevators
+        there are filled in order, each taking people from the front of the
+        floor's queue until it is full. Only the elevators with free space on a
+        floor where someone is waiting are looked at, and only the people who
+        board are taken from the queues.
+
+        The queues are linked lists, so the people who board are found one at a
+        time. Walking every boarding floor's queue together with array operations
+        is slower: only a few floors usually have people boarding in a round, so
+        each array operation would only handle a few people.
+        """
+        free = self.elevator_capacity - self.elevator_loads
+        elevators = np.flatnonzero((free > 0) & (self.waiting_counts[self.elevator_floors] > 0))
+        for elevator in elevators.tolist():
+            floor = int(self.elevator_floors[elevator])
+            num_waiting = int(self.waiting_counts[floor])
+            num_boarding = min(int(free[elevator]), num_waiting)
+            if num_boarding == 0:
+                # An elevator before this one on the same floor took everyone
+                continue
+
+            people = self._take_from_queue(floor, num_boarding)
+            load = int(self.elevator_loads[elevator])
+            self.rider_targets[elevator, load:load + num_boarding] = self.person_targets[people]
+            self.rider_arrivals[elevator, load:load + num_boarding] = self.person_arrivals[people]
+            self.elevator_loads[elevator] = load + num_boarding
+            self.waiting_counts[floor] = num_waiting - num_boarding
+
+    def move_elevators(self) -> None:
+        """Update elevator target floors and then move each one floor closer to its target."""
+        self.elevator_targets = self._targets_for(self.elevator_floors, self.elevator_targets,
+                                                  self.waiting_counts, self.num_floors)
+        self.elevator_floors = self.elevator_floors + np.sign(
+            self.elevator_targets - self.elevator_floors)
+
+    ############################################################################
+    # Helpers
+    ############################################################################
+    def _reserve(self, num_people: int) -> None:
+        """Make sure the person buffers have room for the given number of people,
+        at least doubling their size if they need to grow.
+        """
+        size = len(self.person_targets)
+        if num_people <= size:
+            return
+
+        new_size = max(num_people, 2 * size)
+        for name in ('person_targets', 'person_arrivals', '_next'):
+            old = getattr(self, name)
+            new = np.zeros(new_size, dtype=old.dtype)
+            new[:size] = old
+            setattr(self, name, new)
+
+    def _take_from_queue(self, floor: int, num_people: int) -> np.ndarray:
+        """Remove the given number of people from the front of the given floor's
+        queue, and return their numbers in queue order.
+
+        Preconditions:
+        - 1 <= num_people <= self.waiting_counts[floor]
+        """
+        next_person = self._next
+        person = int(self._heads[floor])
+        people = [person]
+        for _ in range(num_people - 1):
+            person = int(next_person[person])
+            people.append(person)
+        self._heads[floor] = next_person[person]
+        return np.array(people, dtype=np.int64)
+
+    def _calculate_stats(self) -> dict[str, int]:
+        """Report the statistics for the current run of this simulation.
+
+        Preconditions:
+        - This method is only called after the simulation rounds have finished
+        """
+        if self._num_completed > 0:
+            avg_time = self._total_time // self._num_completed
+        else:
+            avg_time = -1
+
+        return {
+            'num_rounds': self.num_rounds,
+            'total_people': self.total_arrivals,
+            'people_completed': self._num_completed,
+            'max_time': self._max_time,
+            'avg_time': avg_time
+        }
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
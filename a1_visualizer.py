@@ -10,6 +10,11 @@ This file contains the Visualizer class, which is responsible for interacting
 with Pygame, the graphics library we're using for this assignment.
 There's quite a bit in this file, but you aren't responsible for most of it.
 
+The people and elevators in a1_entities.py know nothing about Pygame. Sprites
+(found in a1_sprites.py) are only attached to them here, by a Visualizer that is
+actually visualizing. Importing this file does not import Pygame: that only
+happens the first time a Visualizer is built with visualize=True.
+
 DO NOT CHANGE ANY CODE IN THIS FILE. You don't need to for this assignment,
 and in fact you aren't even submitting this file!
 """
@@ -17,102 +22,12 @@ from __future__ import annotations
 from enum import Enum
 import random
 import time
-from typing import Any
-
-import pygame
-
-
-###############################################################################
-# Public sprite classes (you need to read these)
-###############################################################################
-class ElevatorSprite(pygame.sprite.Sprite):
-    """Sprite representing an elevator.
-
-    Instance Attributes:
-    - image: the Pygame surface on which to draw this sprite
-    - rect: the rectangle representing the dimensions of this sprite
-    - passengers:
-        a list of the PersonSprites currently on this elevator
-        NOTE: since Person is a subclass of PersonSprite, you can (and should)
-        add Person objects to this list; see the add_passenger method below
-    """
-    image: pygame.Surface
-    rect: pygame.Rect
-    passengers: list[PersonSprite]
-
-    def __init__(self) -> None:
-        """Initialize a new ElevatorSprite."""
-        super().__init__()
-        self.image = pygame.Surface([ELEVATOR_WIDTH, ELEVATOR_HEIGHT])
-        self.image.fill(GREEN)
-        self.image.set_colorkey(WHITE)
-        self.rect = self.image.get_rect()
-        self.passengers = []
-
-    def update(self) -> None:
-        """Update this elevator's image based on its fullness."""
-        pygame.draw.rect(self.image, GREEN,
-                         [0, 0, ELEVATOR_WIDTH, ELEVATOR_HEIGHT])
-        pygame.draw.rect(self.image, DARK_GREEN,
-                         [0, ELEVATOR_HEIGHT * (1 - self.fullness()),
-                          ELEVATOR_WIDTH, ELEVATOR_HEIGHT])
-
-    def add_passenger(self, person: PersonSprite) -> None:
-        """Add a passenger to this elevator."""
-        self.passengers.append(person)
-
-    def fullness(self) -> float:
-        """Return the fraction that this elevator is filled.
-
-        The value returned should be a float between 0.0 (completely empty) and
-        1.0 (completely full).
-        """
-        raise NotImplementedError
-
+from typing import TYPE_CHECKING
 
-class PersonSprite(pygame.sprite.Sprite):
-    """Sprite representing a person.
-
-    Instance Attributes:
-    - height: the height of the person sprite
-    - width: the width of the person sprite
-    - image: the Pygame surface on which to draw this sprite
-    - rect: the rectangle representing the dimensions of this sprite
-
-    Representation Invariants:
-    - self.height >= 0
-    - self.width >= 0
-    """
-    height: int
-    width: int
-    image: pygame.Surface
-    rect: pygame.Rect
-
-    def __init__(self) -> None:
-        """Initialize a new person sprite."""
-        super().__init__()
-        self.width, self.height = PERSON_WIDTH, PERSON_HEIGHT
-        self.image = self.load_image()
-        self.rect = self.image.get_rect()
-        self.rect.bottom = 0
-        self.rect.centerx = random.randint(-2, 2)
-
-    def load_image(self) -> Any:
-        """Load the image for this sprite and redraws it
-        Lower indices are happier :)
-        """
-        image = pygame.image.load(FIGURES[self.get_anger_level()])
-        return pygame.transform.scale(image, (self.width, self.height))
-
-    def get_anger_level(self) -> int:
-        """Return the anger level of this sprite.
-
-        This determines the image used to render this sprite.
-
-        Anger level must be an integer between 0 and 4, inclusive.
-        (0 means not at all angry, 4 is very angry)
-        """
-        raise NotImplementedError
+if TYPE_CHECKING:
+    import pygame
+    from a1_entities import Person, Elevator
+    from a1_sprites import ElevatorSprite, PersonSprite
 
 
 ###############################################################################
@@ -146,14 +61,17 @@ class Visualizer:
     _screen: pygame.Surface
     _sprite_group: pygame.sprite.Group
     _stats_group: pygame.sprite.Group
+    _elevator_sprites: dict[Elevator, ElevatorSprite]
+    _person_sprites: dict[Person, PersonSprite]
 
     def __init__(self,
-                 elevators: list[ElevatorSprite],
+                 elevators: list[Elevator],
                  num_floors: int,
                  visualize: bool) -> None:
         """Initialize this visualization.
 
-        If visualize is False, this instance does nothing.
+        If visualize is False, this instance does nothing, and no sprites
+        are ever created.
         """
         self._visualize = visualize
         if not self._visualize:
@@ -162,7 +80,9 @@ class Visualizer:
         self._num_elevators = len(elevators)
         self._num_floors = num_floors
 
-        # pygame stuff
+        # pygame stuff. Pygame is only imported (and initialized) here, the first
+        # time a simulation is actually visualized, so headless runs never pay for it.
+        import pygame
         pygame.init()
         self._clock = pygame.time.Clock()
 
@@ -174,6 +94,10 @@ class Visualizer:
         self._sprite_group = pygame.sprite.Group()
         self._stats_group = pygame.sprite.Group()
 
+        # The sprites attached to each elevator and person shown so far
+        self._elevator_sprites = {}
+        self._person_sprites = {}
+
         self._setup_sprites(elevators)
         # Initial render.
         self.render()
@@ -182,11 +106,12 @@ class Visualizer:
         """Render text displaying the round number for this simulation."""
         if not self._visualize:
             return
+        from a1_sprites import StatLineSprite
+
         self._stats_group.remove(list(self._stats_group))
-        self._stats_group.add(_StatLine(0, f'Round {round_num}'))
-        for sprite in self._sprite_group:
-            if isinstance(sprite, PersonSprite):
-                sprite.image = sprite.load_image()
+        self._stats_group.add(StatLineSprite(0, f'Round {round_num}'))
+        for sprite in self._person_sprites.values():
+            sprite.refresh_image()
         self.render()
 
     def render(self) -> None:
@@ -195,6 +120,8 @@ class Visualizer:
         if not self._visualize:
             return
 
+        import pygame
+
         # Need this on OSX due to pygame bug
         pygame.event.peek(0)
 
@@ -205,58 +132,73 @@ class Visualizer:
         pygame.display.flip()
 
     def show_arrivals(self,
-                      arrivals: dict[int, list[PersonSprite]]) -> None:
-        """Show new arrivals."""
+                      arrivals: dict[int, list[Person]]) -> None:
+        """Show new arrivals, attaching a sprite to each new person."""
         if not self._visualize:
             return
 
+        from a1_sprites import PersonSprite
+
         x = 10
         for floor, people in arrivals.items():
             y = self._get_y_of_floor(floor)
             for person in people:
-                person.rect.bottom = y
-                person.rect.centerx = x + random.randint(-3, 3)
-                self._sprite_group.add(person)
+                sprite = PersonSprite(person)
+                sprite.rect.bottom = y
+                sprite.rect.centerx = x + random.randint(-3, 3)
+                self._person_sprites[person] = sprite
+                self._sprite_group.add(sprite)
         self.render()
 
-    def show_boarding(self, person: PersonSprite,
-                      elevator: ElevatorSprite) -> None:
+    def show_boarding(self, person: Person, elevator: Elevator) -> None:
         """Show boarding of the given person onto the given elevator.
 
         Preconditions:
         - the given person is on the same floor as the elevator.
+        - the given person has already been shown arriving.
         """
         if not self._visualize:
             return
 
+        person_sprite = self._person_sprites[person]
+        elevator_sprite = self._elevator_sprites[elevator]
+
         from_x = 10
-        target_x = elevator.rect.centerx + random.randint(-3, 3)
+        target_x = elevator_sprite.rect.centerx + random.randint(-3, 3)
 
         for frame in range(21):  # Move in 20 seconds
-            person.rect.centerx = from_x + (target_x - from_x) * frame // 20
+            person_sprite.rect.centerx = from_x + (target_x - from_x) * frame // 20
             self.render()
 
-        elevator.update()
+        elevator_sprite.update()
         self.render()
 
-    def show_disembarking(self, person: PersonSprite,
-                          elevator: ElevatorSprite) -> None:
+    def show_disembarking(self, person: Person, elevator: Elevator) -> None:
         """Show disembarking of the given person from the given elevator."""
         if not self._visualize:
             return
 
-        from_x = person.rect.centerx
+        person_sprite = self._person_sprites[person]
+
+        from_x = person_sprite.rect.centerx
         target_x = WIDTH - 10
 
-        elevator.update()
+        self._elevator_sprites[elevator].update()
 
         for frame in range(21):  # Move in 20 seconds
             x = from_x + (target_x - from_x) * frame // 20
-            person.rect.centerx = x
+            person_sprite.rect.centerx = x
             self.render()
 
+    def update_elevator(self, elevator: Elevator) -> None:
+        """Redraw the given elevator to show how full it currently is."""
+        if not self._visualize:
+            return
+
+        self._elevator_sprites[elevator].update()
+
     def show_elevator_moves(self,
-                            elevators: list[ElevatorSprite],
+                            elevators: list[Elevator],
                             directions: list[Direction]) -> None:
         """Show elevator moves. Note that all the elevators move at once."""
         if not self._visualize:
@@ -270,9 +212,9 @@ class Visualizer:
                     step = FLOOR_HEIGHT / 20
                 else:
                     step = 0
-                elevator.rect.bottom += step
+                self._elevator_sprites[elevator].rect.bottom += step
                 for passenger in elevator.passengers:
-                    passenger.rect.bottom += step
+                    self._person_sprites[passenger].rect.bottom += step
 
             self.render()
 
@@ -291,6 +233,8 @@ class Visualizer:
         Does nothing if self._visualize is False.
         """
         if self._visualize:
+            import pygame
+
             # This waits for you to close the pygame window (by pressing the "close" button)
             while True:
                 for event in pygame.event.get():
@@ -301,26 +245,31 @@ class Visualizer:
     ###########################################################################
     # Private helper methods (you don't need to worry about these)
     ###########################################################################
-    def _setup_sprites(self, elevators: list[ElevatorSprite]) -> None:
-        """Set up the initial sprites for this visualization.
+    def _setup_sprites(self, elevators: list[Elevator]) -> None:
+        """Set up the initial sprites for this visualization, attaching a sprite
+        to each elevator.
 
         Position them on the screen and spaces them based on:
         - Size of the screen
         - Number of each item
         """
+        from a1_sprites import ElevatorSprite, FloorSprite, FloorNumSprite
+
         for i in range(1, self._num_floors + 1):
             y = self._get_y_of_floor(i)
-            floor = _FloorSprite(WIDTH, FLOOR_HEIGHT, y)
-            floor_num = _FloorNum(y - 20, str(i))
+            floor = FloorSprite(WIDTH, FLOOR_HEIGHT, y)
+            floor_num = FloorNumSprite(y - 20, str(i))
             self._sprite_group.add(floor_num)
             self._sprite_group.add(floor)
 
         for i, elevator in enumerate(elevators):
-            elevator.rect.centerx =\
+            sprite = ElevatorSprite(elevator)
+            sprite.rect.centerx =\
                 (i + 1) * WIDTH // (self._num_elevators + 1)
-            elevator.rect.bottom = self._total_height() - FLOOR_BORDER_HEIGHT
+            sprite.rect.bottom = self._total_height() - FLOOR_BORDER_HEIGHT
 
-            self._sprite_group.add(elevator)
+            self._elevator_sprites[elevator] = sprite
+            self._sprite_group.add(sprite)
 
     def _total_height(self) -> int:
         """Return the screen height for this visualization."""
@@ -366,50 +315,5 @@ FPS = 60
 # Images for people
 FIGURES = [f'images/person{i}.png' for i in range(1, 6)]
 
-# Fonts
+# Fonts (loaded by a1_sprites.get_font the first time they are needed)
 FONT_HEIGHT = 30
-pygame.init()  # Need to call this before creating a new font
-COMIC_SANS = pygame.font.SysFont('Comic Sans MS', FONT_HEIGHT)
-
-
-###############################################################################
-# Private sprite classes (you don't need to worry about these)
-###############################################################################
-class _FloorSprite(pygame.sprite.Sprite):
-    """Sprite that draws a floor of the building.
-    """
-    def __init__(self, width: int, height: int, y: int) -> None:
-        """Initialize a sprite representing a floor of the building."""
-        super().__init__()
-        self.image = pygame.Surface([width, height])
-        self.image.fill(WHITE)
-        self.image.set_colorkey(WHITE)
-        pygame.draw.rect(self.image, BLUE, [0, 0, width, FLOOR_BORDER_HEIGHT])
-        self.rect = self.image.get_rect()
-        self.rect.top = y
-
-
-class _FloorNum(pygame.sprite.Sprite):
-    """Text Sprite to Label the floor number.
-    """
-    def __init__(self, floor_y: int, text: str) -> None:
-        """Initialize a floor number text sprite."""
-        super().__init__()
-        self.floor_font = COMIC_SANS
-        self.image = self.floor_font.render(text, True, BLACK)
-        self.rect = self.image.get_rect()
-        self.rect.bottom = floor_y
-        self.rect.right = WIDTH - 20
-
-
-class _StatLine(pygame.sprite.Sprite):
-    """Text Sprite for displaying some text.
-    """
-    def __init__(self, y: int, text: str) -> None:
-        """Initialize a text sprite."""
-        super().__init__()
-        self.floor_font = COMIC_SANS
-        self.image = self.floor_font.render(text, True, BLACK)
-        self.rect = self.image.get_rect()
-        self.rect.top = y
-        self.rect.left = 5